@@ -0,0 +1,123 @@
+import pandas as pd
+from tqdm import tqdm
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import urllib3
+import time
+import os
+
+from reed_client import RETRY_STATUS_CODES, TokenBucket, make_session, get_with_retry
+from reed_cache import DetailsCache
+
+# ✅ Suppress SSL warnings
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# ✅ Your REED API Key here (or set REED_API_KEY)
+API_KEY = os.environ.get('REED_API_KEY', '')
+
+# Constants
+# Set REED_API_ROOT to point at reed_stub_server.py for offline testing
+API_ROOT = os.environ.get('REED_API_ROOT', 'https://www.reed.co.uk/api/1.0')
+DETAILS_URL = API_ROOT + '/jobs/{job_id}'
+WORKERS = 4               # details requests in flight at once
+RATE_LIMIT_PER_SEC = 2.0  # token bucket refill rate, match this to your Reed quota
+RATE_LIMIT_BURST = 4
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 1.0
+CHUNK_SIZE = 500          # adverts read, enriched and written per batch
+
+# Files
+INPUT_FILE = 'reed_jobs_uk_extended.csv'
+OUTPUT_FILE = 'reed_jobs_uk_enriched.csv'
+CACHE_DIR = 'reed_details_cache'
+
+# Adverts whose details fetch failed for good (4xx such as 404 for a withdrawn advert)
+# are remembered in the cache and skipped; set True to try them again
+REFRESH_FAILED = False
+# 4xx codes that say nothing about the advert itself (bad key, throttling, timeout)
+TRANSIENT_4XX = {401, 403, 408} | RETRY_STATUS_CODES
+
+
+def permanent_failure(error):
+    """Status code of an HTTP error that retrying will not fix, else None."""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    status = response.status_code
+    return status if 400 <= status < 500 and status not in TRANSIENT_4XX else None
+
+
+def fetch_details(job_id):
+    response = get_with_retry(
+        session, DETAILS_URL.format(job_id=job_id), bucket,
+        max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS
+    )
+    return job_id, response.content
+
+
+session = make_session(API_KEY, pool_size=WORKERS)
+bucket = TokenBucket(RATE_LIMIT_PER_SEC, RATE_LIMIT_BURST)
+cache = DetailsCache(CACHE_DIR)
+
+hits = misses = errors = known_failed = 0
+fetch_seconds = 0.0
+header = True
+
+print("🔄 Enriching adverts with full descriptions...")
+progress = tqdm(desc='Enriching Jobs', ncols=100)
+
+try:
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        for chunk in pd.read_csv(INPUT_FILE, chunksize=CHUNK_SIZE):
+            job_ids = chunk['jobId'].dropna().astype(int).unique().tolist()
+
+            # Only fetch adverts the cache has never seen (or seen fail, unless refreshing)
+            cached = cache.cached_ids(job_ids)
+            failed = set() if REFRESH_FAILED else cache.failed_ids(job_ids)
+            missing = [j for j in job_ids if j not in cached and j not in failed]
+            hits += len(cached)
+            known_failed += len(failed)
+            misses += len(missing)
+
+            started = time.monotonic()
+            futures = [pool.submit(fetch_details, j) for j in missing]
+            fetched, gone = [], []
+            for job_id, future in zip(missing, futures):
+                try:
+                    fetched.append(future.result())
+                except requests.RequestException as e:
+                    errors += 1
+                    status = permanent_failure(e)
+                    if status is not None:
+                        gone.append((job_id, status))
+                    print(f"⚠️ Details fetch failed: {e}")
+            fetch_seconds += time.monotonic() - started
+            cache.put_many(fetched)
+            cache.put_failed(gone)
+
+            # Swap the truncated snippet for the full description where we have one
+            full = {}
+            for job_id in job_ids:
+                details = cache.get(job_id)
+                if details and details.get('jobDescription'):
+                    full[job_id] = details['jobDescription']
+
+            chunk['jobDescriptionSnippet'] = chunk['jobDescription']
+            chunk['jobDescription'] = chunk['jobId'].map(full).fillna(chunk['jobDescription'])
+            chunk.to_csv(OUTPUT_FILE, mode='w' if header else 'a', header=header, index=False)
+            header = False
+            progress.update(len(chunk))
+
+except Exception as e:
+    print(f"\n⚠️ Script failed with error: {e}")
+    print(f"💾 Fetched details are cached in {CACHE_DIR}, rerun to continue.")
+
+finally:
+    progress.close()
+    cache.close()
+    fetched_ok = misses - errors
+    rate = fetched_ok / fetch_seconds if fetch_seconds else 0.0
+    print(f"\n✅ Finished. Cache hits: {hits}, misses: {misses}, failed: {errors}, "
+          f"skipped as failed before: {known_failed}")
+    print(f"⚡ Fetched {fetched_ok} adverts at {rate:.1f} adverts/sec")
+    print(f"📄 Enriched data saved to: {OUTPUT_FILE}")
@@ -1,82 +1,147 @@
-import requests
-import pandas as pd
 from tqdm import tqdm
-import time
 import urllib3
 import os
 
+from reed_client import TokenBucket, make_session, iter_pages
+from reed_checkpoint import PageCheckpoint
+from reed_index import JobIndex
+
 # ✅ Suppress SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-# ✅ Your REED API Key here
-API_KEY = ''
+# ✅ Your REED API Key here (or set REED_API_KEY)
+API_KEY = os.environ.get('REED_API_KEY', '')
 
 # Constants
-BASE_URL = 'https://www.reed.co.uk/api/1.0/search'
+# Set REED_API_ROOT to point at reed_stub_server.py for offline testing
+API_ROOT = os.environ.get('REED_API_ROOT', 'https://www.reed.co.uk/api/1.0')
+BASE_URL = f'{API_ROOT}/search'
 PAGE_SIZE = 25
 MAX_EMPTY_RESPONSES = 5  # stop after multiple empty pages
 
+# Concurrency and rate limiting
+CONCURRENCY = 4           # page offsets kept in flight at once (1 = sequential)
+RATE_LIMIT_PER_SEC = 2.0  # token bucket refill rate, match this to your Reed quota
+RATE_LIMIT_BURST = 4      # max requests allowed back to back
+MAX_RETRIES = 5           # retries per page on 429/5xx before giving up
+BACKOFF_SECONDS = 1.0     # base for exponential backoff when no Retry-After is sent
+
 # Output files
 FINAL_FILE = 'reed_jobs_uk_extended.csv'
-PARTIAL_FILE = 'reed_jobs_partial.csv'
+CHECKPOINT_DIR = 'reed_checkpoint'  # per-page JSONL shards + manifest.json
+RESUME = True  # pick up from the last checkpointed page after a crash
+
+# Delta mode: only keep adverts not already in FINAL_FILE and append them to it
+DELTA_MODE = False
+INDEX_FILE = 'reed_seen_jobs.sqlite'  # persistent jobId index of FINAL_FILE
+KNOWN_PAGE_LIMIT = 3  # stop after this many pages in a row with only known jobIds
+
+# Persistent jobId index, rebuilt from the master file only when it is new or the
+# file was changed outside the scraper since the index was last written
+job_index = JobIndex(INDEX_FILE)
+if job_index.out_of_date(FINAL_FILE):
+    print(f"🗂️ Building jobId index from {FINAL_FILE}...")
+    job_index.rebuild_from_csv(FINAL_FILE)
 
 # Resumable storage
-all_jobs = []
-page = 1
-empty_page_count = 0
+checkpoint = PageCheckpoint(CHECKPOINT_DIR, PAGE_SIZE)
 
-print("🔄 Starting job scraping...")
+# A finished delta run that crashed before merging gets merged now
+if DELTA_MODE and checkpoint.complete and not checkpoint.merged:
+    checkpoint.concat_to_csv(FINAL_FILE, append=True)
+    job_index.add(checkpoint.iter_job_ids())
+    checkpoint.mark_merged()
 
-# Create progress bar without knowing total jobs ahead of time
-progress = tqdm(desc='Fetching Jobs', ncols=100)
+if not RESUME or checkpoint.complete:
+    checkpoint.reset()
 
-try:
-    while True:
-        params = {
-            'resultsToTake': PAGE_SIZE,
-            'resultsToSkip': (page - 1) * PAGE_SIZE
-        }
-
-        response = requests.get(
-            BASE_URL,
-            headers={'Accept': 'application/json'},
-            auth=(API_KEY, ''),
-            params=params,
-            verify=False
-        )
-
-        if response.status_code != 200:
-            print(f"❌ Error {response.status_code}: {response.text}")
-            break
+page = checkpoint.next_page
+empty_page_count = checkpoint.empty_page_count
+known_page_count = 0
 
-        jobs = response.json().get('results', [])
+# jobIds collected by this run so far (also dedupes pages that shift while we scrape)
+run_job_ids = set(checkpoint.iter_job_ids()) if DELTA_MODE else set()
 
+if page > 1:
+    print(f"🔁 Resuming from page {page} (resultsToSkip={(page - 1) * PAGE_SIZE}, "
+          f"{checkpoint.jobs_written} jobs already saved)")
+else:
+    print("🔄 Starting job scraping...")
+
+# Create progress bar without knowing total jobs ahead of time
+progress = tqdm(desc='Fetching Jobs', ncols=100, initial=checkpoint.jobs_written)
+
+# Pooled session + shared rate limiter for all worker threads
+session = make_session(API_KEY, pool_size=CONCURRENCY)
+bucket = TokenBucket(RATE_LIMIT_PER_SEC, RATE_LIMIT_BURST)
+pages = iter_pages(
+    session, BASE_URL, bucket, PAGE_SIZE,
+    start_page=page,
+    concurrency=CONCURRENCY,
+    max_retries=MAX_RETRIES,
+    backoff=BACKOFF_SECONDS
+)
+
+try:
+    for page, jobs in pages:
         if not jobs:
             empty_page_count += 1
             print(f"⚠️ Empty page #{empty_page_count} (Page {page})")
-            if empty_page_count >= MAX_EMPTY_RESPONSES:
-                print("⛔ Too many empty pages, assuming end of data.")
-                break
         else:
             empty_page_count = 0
 
-        for job in jobs:
-            if job.get('jobId') and job.get('jobTitle'):
-                all_jobs.append(job)
-                progress.update(1)
-
-        # Save progress after every page
-        pd.DataFrame(all_jobs).to_csv(PARTIAL_FILE, index=False)
+        page_jobs = [job for job in jobs if job.get('jobId') and job.get('jobTitle')]
+
+        if DELTA_MODE:
+            known_ids = job_index.known(job['jobId'] for job in page_jobs)
+            new_jobs = []
+            for job in page_jobs:
+                if job['jobId'] not in known_ids and job['jobId'] not in run_job_ids:
+                    run_job_ids.add(job['jobId'])
+                    new_jobs.append(job)
+            if page_jobs and not new_jobs:
+                known_page_count += 1
+            else:
+                known_page_count = 0
+            page_jobs = new_jobs
+
+        progress.update(len(page_jobs))
+
+        # Append this page to the checkpoint (no full rewrite)
+        checkpoint.write_page(page, page_jobs, empty_page_count)
+
+        if empty_page_count >= MAX_EMPTY_RESPONSES:
+            print("⛔ Too many empty pages, assuming end of data.")
+            checkpoint.mark_complete()
+            break
 
-        page += 1
-        time.sleep(0.5)
+        if DELTA_MODE and known_page_count >= KNOWN_PAGE_LIMIT:
+            print(f"⛔ {known_page_count} pages in a row with only known jobs, caught up.")
+            checkpoint.mark_complete()
+            break
 
 except Exception as e:
     print(f"\n⚠️ Script failed with error: {e}")
-    print("💾 Saving partial progress...")
+    print(f"💾 Progress is checkpointed in {CHECKPOINT_DIR}, rerun to resume.")
 
 finally:
+    pages.close()
     progress.close()
-    pd.DataFrame(all_jobs).to_csv(FINAL_FILE, index=False)
-    print(f"\n✅ Finished. Total jobs scraped: {len(all_jobs)}")
-    print(f"📄 Final saved to: {FINAL_FILE}")
+    if not DELTA_MODE:
+        # The master file now holds exactly this run's adverts, so index those ids
+        checkpoint.concat_to_csv(FINAL_FILE)
+        job_index.replace(checkpoint.iter_job_ids())
+        if checkpoint.complete:
+            checkpoint.mark_merged()
+        print(f"\n✅ Finished. Total jobs scraped: {checkpoint.jobs_written}")
+        print(f"📄 Final saved to: {FINAL_FILE}")
+    elif checkpoint.complete:
+        # Append only the new adverts to the master file, then record their ids
+        checkpoint.concat_to_csv(FINAL_FILE, append=True)
+        job_index.add(checkpoint.iter_job_ids())
+        checkpoint.mark_merged()
+        print(f"\n✅ Finished. New jobs added: {checkpoint.jobs_written}")
+        print(f"📄 Merged into: {FINAL_FILE} ({len(job_index)} jobs in total)")
+    else:
+        print(f"\n⏸️ Delta run incomplete: {checkpoint.jobs_written} new jobs held in {CHECKPOINT_DIR}")
+    job_index.close()
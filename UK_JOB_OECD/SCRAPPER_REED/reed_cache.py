@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+from reed_index import ids_in_table
+
+
+class DetailsCache:
+    """Content-addressed store for job-details responses.
+
+    Each response body is saved once under objects/<sha[:2]>/<sha>.json, named
+    by the SHA-256 of its bytes, and a SQLite table maps jobId -> sha. Identical
+    bodies are stored once, and a jobId in the table is never fetched again.
+    Fetches that failed for good (e.g. 404 for a withdrawn advert) are kept as
+    negative entries with their status code, so they are not retried either.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, 'objects')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(directory, 'index.sqlite'))
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS details (job_id INTEGER PRIMARY KEY, sha256 TEXT NOT NULL)'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS failed (job_id INTEGER PRIMARY KEY, status INTEGER NOT NULL)'
+        )
+        self.conn.commit()
+
+    def _object_path(self, sha):
+        return os.path.join(self.objects_dir, sha[:2], sha + '.json')
+
+    def cached_ids(self, job_ids):
+        return ids_in_table(self.conn, 'details', job_ids)
+
+    def failed_ids(self, job_ids):
+        return ids_in_table(self.conn, 'failed', job_ids)
+
+    def get(self, job_id):
+        row = self.conn.execute(
+            'SELECT sha256 FROM details WHERE job_id = ?', (int(job_id),)
+        ).fetchone()
+        if row is None:
+            return None
+        with open(self._object_path(row[0]), 'rb') as f:
+            return json.loads(f.read())
+
+    def put_many(self, items):
+        """Store (job_id, body_bytes) pairs and index them in one transaction."""
+        rows = []
+        for job_id, body in items:
+            sha = hashlib.sha256(body).hexdigest()
+            path = self._object_path(sha)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(body)
+                os.replace(tmp_path, path)
+            rows.append((int(job_id), sha))
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO details (job_id, sha256) VALUES (?, ?)', rows
+            )
+            # A refreshed advert that now loads is no longer a failure
+            self.conn.executemany('DELETE FROM failed WHERE job_id = ?', ((j,) for j, _ in rows))
+
+    def put_failed(self, items):
+        """Record (job_id, status_code) pairs for fetches that will not succeed on retry."""
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO failed (job_id, status) VALUES (?, ?)',
+                ((int(job_id), int(status)) for job_id, status in items)
+            )
+
+    def close(self):
+        self.conn.close()
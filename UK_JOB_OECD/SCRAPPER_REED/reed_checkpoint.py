@@ -0,0 +1,135 @@
+import glob
+import json
+import os
+import shutil
+
+import pandas as pd
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def _write_atomic(path, text):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class PageCheckpoint:
+    """Append-only scrape checkpoint: one JSONL shard per page plus a small manifest.
+
+    Each page is written to its own shard and only then recorded in the
+    manifest, so a crash can lose at most the page being written. The
+    manifest holds the next page to fetch and its `resultsToSkip`, which is
+    all a resumed run needs.
+    """
+
+    def __init__(self, directory, page_size):
+        self.directory = directory
+        self.page_size = page_size
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        return {
+            'next_page': 1,
+            'last_results_to_skip': None,
+            'page_size': self.page_size,
+            'jobs_written': 0,
+            'empty_page_count': 0,
+            'complete': False,
+            'merged': False
+        }
+
+    @property
+    def next_page(self):
+        return self.manifest['next_page']
+
+    @property
+    def jobs_written(self):
+        return self.manifest['jobs_written']
+
+    @property
+    def empty_page_count(self):
+        return self.manifest['empty_page_count']
+
+    @property
+    def complete(self):
+        return self.manifest['complete']
+
+    @property
+    def merged(self):
+        return self.manifest.get('merged', False)
+
+    def shard_path(self, page):
+        return os.path.join(self.directory, f'page_{page:06d}.jsonl')
+
+    def write_page(self, page, jobs, empty_page_count):
+        if jobs:
+            _write_atomic(
+                self.shard_path(page),
+                ''.join(json.dumps(job, ensure_ascii=False) + '\n' for job in jobs)
+            )
+        self.manifest.update({
+            'next_page': page + 1,
+            'last_results_to_skip': (page - 1) * self.page_size,
+            'jobs_written': self.manifest['jobs_written'] + len(jobs),
+            'empty_page_count': empty_page_count
+        })
+        self._save_manifest()
+
+    def mark_complete(self):
+        self.manifest['complete'] = True
+        self._save_manifest()
+
+    def mark_merged(self):
+        self.manifest['merged'] = True
+        self._save_manifest()
+
+    def _save_manifest(self):
+        _write_atomic(self.manifest_path, json.dumps(self.manifest, indent=2))
+
+    def shards(self):
+        return sorted(glob.glob(os.path.join(self.directory, 'page_*.jsonl')))
+
+    def iter_jobs(self):
+        for path in self.shards():
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    yield json.loads(line)
+
+    def iter_job_ids(self):
+        for job in self.iter_jobs():
+            yield job['jobId']
+
+    def concat_to_csv(self, output_path, append=False):
+        """Stream the shards into one CSV, one page in memory at a time.
+
+        With `append=True` the rows are added to the end of an existing CSV,
+        aligned to its header, without reading the rest of that file.
+        """
+        columns = None
+        mode = 'w'
+        if append and os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+            columns = list(pd.read_csv(output_path, nrows=0).columns)
+            mode = 'a'
+        with open(output_path, mode, encoding='utf-8', newline='') as out:
+            for path in self.shards():
+                page_df = pd.read_json(path, lines=True, dtype=False)
+                if columns is None:
+                    columns = list(page_df.columns)
+                    page_df.to_csv(out, index=False)
+                else:
+                    page_df.reindex(columns=columns).to_csv(out, index=False, header=False)
+        return output_path
+
+    def reset(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+        self.manifest = self._load_manifest()
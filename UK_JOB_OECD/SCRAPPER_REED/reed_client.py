@@ -0,0 +1,108 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Status codes worth retrying: throttling and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second, bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(api_key, pool_size=10):
+    """One pooled session so every request reuses keep-alive connections."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Accept': 'application/json'})
+    session.auth = (api_key, '')
+    session.verify = False
+    return session
+
+
+def get_with_retry(session, url, bucket, params=None, max_retries=5, backoff=1.0, timeout=30):
+    """GET through the rate limiter, backing off on 429/5xx and connection errors.
+
+    Honours `Retry-After` when the server sends one, otherwise waits
+    backoff * 2**attempt. Raises on a non-retryable status or when retries run out.
+    """
+    for attempt in range(max_retries + 1):
+        bucket.acquire()
+        try:
+            response = session.get(url, params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == max_retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+            continue
+
+        if response.status_code == 200:
+            return response
+        if response.status_code not in RETRY_STATUS_CODES or attempt == max_retries:
+            response.raise_for_status()
+            return response
+
+        retry_after = response.headers.get('Retry-After')
+        try:
+            wait = float(retry_after)
+        except (TypeError, ValueError):
+            wait = backoff * 2 ** attempt
+        time.sleep(wait)
+
+
+def fetch_page(session, url, bucket, page, page_size, **retry_kwargs):
+    params = {
+        'resultsToTake': page_size,
+        'resultsToSkip': (page - 1) * page_size
+    }
+    response = get_with_retry(session, url, bucket, params=params, **retry_kwargs)
+    return response.json().get('results', [])
+
+
+def iter_pages(session, url, bucket, page_size, start_page=1, concurrency=4, **retry_kwargs):
+    """Yield (page, jobs) in page order while keeping `concurrency` offsets in flight.
+
+    The caller decides when to stop (e.g. after several empty pages) by closing
+    the generator; pages still in flight at that point are discarded.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        in_flight = {}
+        next_page = start_page
+        current = start_page
+        try:
+            while True:
+                while len(in_flight) < concurrency:
+                    in_flight[next_page] = pool.submit(
+                        fetch_page, session, url, bucket, next_page, page_size, **retry_kwargs
+                    )
+                    next_page += 1
+                jobs = in_flight.pop(current).result()
+                yield current, jobs
+                current += 1
+        finally:
+            for future in in_flight.values():
+                future.cancel()
@@ -0,0 +1,67 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+
+def ids_in_table(conn, table, job_ids):
+    """Return the subset of `job_ids` present in `table` (keyed on job_id)."""
+    job_ids = [int(j) for j in job_ids]
+    found = set()
+    # SQLite caps bound parameters, so look up in slices
+    for start in range(0, len(job_ids), 500):
+        batch = job_ids[start:start + 500]
+        placeholders = ','.join('?' * len(batch))
+        rows = conn.execute(f'SELECT job_id FROM {table} WHERE job_id IN ({placeholders})', batch)
+        found.update(row[0] for row in rows)
+    return found
+
+
+class JobIndex:
+    """Persistent set of jobIds already held in the master dataset (SQLite, keyed lookup)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.created = not os.path.exists(path)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS seen_jobs (job_id INTEGER PRIMARY KEY)')
+        self.conn.commit()
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM seen_jobs').fetchone()[0]
+
+    def known(self, job_ids):
+        """Return the subset of `job_ids` already in the index."""
+        return ids_in_table(self.conn, 'seen_jobs', job_ids)
+
+    def out_of_date(self, csv_path):
+        """True when `csv_path` exists and the index is new or older than it."""
+        if not os.path.exists(csv_path):
+            return False
+        return self.created or os.path.getmtime(self.path) < os.path.getmtime(csv_path)
+
+    def add(self, job_ids):
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO seen_jobs (job_id) VALUES (?)',
+                ((int(j),) for j in job_ids)
+            )
+        # Touch the file even when every id was known, so it stays newer than the CSV
+        os.utime(self.path)
+
+    def replace(self, job_ids):
+        """Reset the index to `job_ids` (e.g. the adverts a full run just wrote)."""
+        with self.conn:
+            self.conn.execute('DELETE FROM seen_jobs')
+        self.add(job_ids)
+
+    def rebuild_from_csv(self, csv_path, chunksize=100_000):
+        """Reset the index to the jobIds in `csv_path`, streaming only that column."""
+        self.replace([])
+        if not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0:
+            return
+        for chunk in pd.read_csv(csv_path, usecols=['jobId'], chunksize=chunksize):
+            self.add(chunk['jobId'].dropna())
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,203 @@
+"""Local stand-in for the Reed API, for load-testing the scraper offline.
+
+Serves /api/1.0/search and /api/1.0/jobs/<jobId> from a synthetic corpus (or
+a recorded CSV/JSONL) with configurable latency, 429 throttling, empty pages
+and server errors. Point the scraper at it with:
+
+    python reed_stub_server.py --adverts 50000 --rate-limit 20 --error-rate 0.02
+    REED_API_ROOT=http://127.0.0.1:8000/api/1.0 python REED_SCRAPER.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+
+SNIPPET_LENGTH = 150
+TEXT_COLUMNS = ['jobTitle', 'employerName', 'locationName', 'jobDescription']
+
+TITLES = [
+    "Data Entry Clerk", "Data Analyst", "Data Scientist", "Database Administrator",
+    "Software Engineer", "Care Assistant", "HGV Driver", "Retail Assistant",
+    "Office Administrator", "Management Consultant"
+]
+SENTENCES = [
+    "You will be responsible for data entry and keeping records accurate.",
+    "Experience with SQL databases and an Oracle server is essential.",
+    "The role involves data analytics, statistical analysis and visualisation in Python.",
+    "You will build machine learning models as part of our data science team.",
+    "The candidate will input customer details into our admin system.",
+    "We offer a competitive salary and a friendly team.",
+    "You will work closely with stakeholders across the business.",
+    "Full training will be provided for the right candidate.",
+    "Previous experience in a similar role is desirable but not essential.",
+    "Please apply with an up to date CV."
+]
+LOCATIONS = ["London", "Manchester", "Leeds", "Bristol", "Glasgow", "Cardiff", "Birmingham"]
+
+
+def synthetic_corpus(n_adverts, seed):
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(n_adverts):
+        job_id = 50_000_000 + i
+        description = ' '.join(rng.sample(SENTENCES, rng.randint(3, 7)))
+        minimum = rng.randrange(18_000, 60_000, 1_000)
+        jobs.append({
+            'jobId': job_id,
+            'employerId': rng.randint(1_000, 9_999),
+            'employerName': f"Employer {rng.randint(1, 500)}",
+            'jobTitle': rng.choice(TITLES),
+            'locationName': rng.choice(LOCATIONS),
+            'minimumSalary': float(minimum),
+            'maximumSalary': float(minimum + rng.randrange(0, 15_000, 1_000)),
+            'currency': 'GBP',
+            'expirationDate': '30/06/2022',
+            'date': f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2022",
+            'jobDescription': description,
+            'applications': rng.randint(0, 200),
+            'jobUrl': f"https://www.reed.co.uk/jobs/{job_id}"
+        })
+    return jobs
+
+
+def recorded_corpus(path):
+    if path.endswith('.jsonl'):
+        df = pd.read_json(path, lines=True, dtype=False)
+    else:
+        df = pd.read_csv(path)
+    # Recorded adverts can have blank text fields; serve them as "" so slicing works
+    for column in TEXT_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].fillna('').astype(str)
+    return json.loads(df.to_json(orient='records'))
+
+
+class StubState:
+    def __init__(self, jobs, args):
+        self.jobs = jobs
+        self.by_id = {job['jobId']: job for job in jobs}
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.stats = Counter()
+
+    def roll(self):
+        with self.lock:
+            return self.rng.random()
+
+    def throttled(self):
+        """Fixed one-second window quota, like a per-key API limit."""
+        if not self.args.rate_limit:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            if now - self.window_start >= 1.0:
+                self.window_start = now
+                self.window_count = 0
+            self.window_count += 1
+            return self.window_count > self.args.rate_limit
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    state = None
+    details_path = re.compile(r'^/api/1\.0/jobs/(\d+)$')
+
+    def log_message(self, format, *args):
+        if self.state.args.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.state.lock:
+            self.state.stats[status] += 1
+
+    def do_GET(self):
+        state = self.state
+        args = state.args
+
+        if args.latency_ms:
+            jitter = args.jitter_ms * (2 * state.roll() - 1)
+            time.sleep(max(0.0, args.latency_ms + jitter) / 1000)
+
+        if state.throttled():
+            self._send_json(429, {'error': 'Too many requests'}, {'Retry-After': str(args.retry_after)})
+            return
+        if state.roll() < args.error_rate:
+            self._send_json(500, {'error': 'Internal server error'})
+            return
+
+        url = urlparse(self.path)
+        if url.path == '/api/1.0/search':
+            query = parse_qs(url.query)
+            take = min(int(query.get('resultsToTake', ['100'])[0]), 100)
+            skip = int(query.get('resultsToSkip', ['0'])[0])
+            if state.roll() < args.empty_rate:
+                page = []
+            else:
+                page = [
+                    dict(job, jobDescription=job['jobDescription'][:SNIPPET_LENGTH] + '...')
+                    for job in state.jobs[skip:skip + take]
+                ]
+            self._send_json(200, {'results': page, 'totalResults': len(state.jobs)})
+            return
+
+        match = self.details_path.match(url.path)
+        if match:
+            job = state.by_id.get(int(match.group(1)))
+            if job is None:
+                self._send_json(404, {'error': 'Job not found'})
+            else:
+                self._send_json(200, job)
+            return
+
+        self._send_json(404, {'error': 'Not found'})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--adverts', type=int, default=10_000, help='size of the synthetic corpus')
+    parser.add_argument('--corpus', help='serve a recorded CSV/JSONL of adverts instead')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='mean response delay')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='+/- uniform jitter on the delay')
+    parser.add_argument('--rate-limit', type=int, default=0, help='requests per second before 429 (0 = off)')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After sent with a 429')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 500')
+    parser.add_argument('--empty-rate', type=float, default=0.0, help='fraction of search pages returned empty')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    jobs = recorded_corpus(args.corpus) if args.corpus else synthetic_corpus(args.adverts, args.seed)
+    StubHandler.state = StubState(jobs, args)
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+
+    print(f"🧪 Reed stub serving {len(jobs)} adverts on http://{args.host}:{args.port}/api/1.0")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n📊 Responses by status: {dict(StubHandler.state.stats)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from paths import DATA_DIR, MAPPING_DIR
+from concordance import load_concordance
+from corpus_store import STORE_PATH, quote
+
+# Materialised chunk / job counts keyed by (concordance, month, soc_code, sector, Type).
+# Each run compares a fingerprint of every advert in the corpus store (SOC, month,
+# kept-chunk counts) with the one it was counted with, and only re-counts adverts
+# that are new, changed (e.g. a new SOC from synthetic_soc_data.py, re-scored chunks)
+# or gone, so a new scrape batch does not mean a rebuild. The cube is rebuilt when
+# the thresholds, Type rules or concordance change, or with FULL_REBUILD = True.
+CUBE_PATH = os.path.join(DATA_DIR, "cube.sqlite")
+CONCORDANCE_PATH = os.path.join(MAPPING_DIR, "soc_to_sector.csv")
+FULL_REBUILD = False
+MERGE_BATCH_JOBS = 50_000
+
+UNMAPPED = "unmapped"  # sector of SOCs missing from a concordance
+UNDATED = "unknown"    # month of adverts without a parseable date
+
+# Measures per cell (all carry the concordance weight of the SOC -> sector split):
+#   chunks           kept chunks of that Type
+#   weighted_chunks  Type count x kept chunks of the job, summed over jobs; the
+#                    measure soc_level_aggregated and the sector totals use
+#   jobs             kept jobs with at least one chunk of that Type
+MEASURES = ["chunks", "weighted_chunks", "jobs"]
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cube (
+        concordance TEXT NOT NULL, month TEXT NOT NULL, soc_code TEXT NOT NULL,
+        sector TEXT NOT NULL, Type TEXT NOT NULL,
+        chunks REAL NOT NULL, weighted_chunks REAL NOT NULL, jobs REAL NOT NULL,
+        PRIMARY KEY (concordance, month, soc_code, sector, Type)
+    );
+    CREATE INDEX IF NOT EXISTS idx_cube_sector_month ON cube (concordance, sector, month);
+    CREATE TABLE IF NOT EXISTS merged_jobs (
+        job_id INTEGER PRIMARY KEY, fingerprint INTEGER NOT NULL, soc_code TEXT, month TEXT
+    );
+    CREATE TABLE IF NOT EXISTS merged_counts (
+        job_id INTEGER NOT NULL, Type TEXT NOT NULL, chunks INTEGER NOT NULL, PRIMARY KEY (job_id, Type)
+    );
+    CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def open_cube(path=CUBE_PATH):
+    conn = sqlite3.connect(path)
+    # Cubes from before per-advert fingerprints are emptied and counted again
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'merged_jobs'").fetchone() and \
+            "fingerprint" not in [row[1] for row in conn.execute("PRAGMA table_info(merged_jobs)")]:
+        conn.executescript("DROP TABLE merged_jobs; DROP TABLE cube;")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# Everything the cell values depend on besides the adverts themselves
+def config_key(types, min_similarity, term_threshold, conc, tagger_files):
+    digest = hashlib.sha1()
+    digest.update(json.dumps([list(types), float(min_similarity), term_threshold]).encode())
+    digest.update(conc.to_csv(index=False).encode())
+    for path in tagger_files:
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def reset_cube(conn):
+    with conn:
+        conn.execute("DELETE FROM cube")
+        conn.execute("DELETE FROM merged_jobs")
+        conn.execute("DELETE FROM merged_counts")
+
+
+# Cells for a batch of jobs: job_cells has job_id, soc_code, month and the
+# per-Type chunk counts; each job's counts are spread over its SOC's sectors
+def cube_cells(job_cells, types, conc):
+    job_cells = job_cells.assign(n_chunks=job_cells[types].sum(axis=1))
+    long = job_cells.melt(id_vars=["job_id", "soc_code", "month", "n_chunks"], value_vars=types,
+                          var_name="Type", value_name="chunks")
+    long = long[long["chunks"] > 0]
+    long["weighted_chunks"] = long["chunks"] * long["n_chunks"]
+    long["jobs"] = 1.0
+
+    cells = []
+    for name, mapping in conc.groupby("concordance", sort=False):
+        spread = long.merge(mapping[["soc_code", "sector", "weight"]], on="soc_code", how="left")
+        spread["sector"] = spread["sector"].fillna(UNMAPPED)
+        spread["weight"] = spread["weight"].fillna(1.0)
+        spread[MEASURES] = spread[MEASURES].mul(spread["weight"], axis=0)
+        spread["concordance"] = name
+        cells.append(spread)
+    if not cells:
+        return pd.DataFrame(columns=["concordance", "month", "soc_code", "sector", "Type", *MEASURES])
+    cells = pd.concat(cells, ignore_index=True)
+    return cells.groupby(["concordance", "month", "soc_code", "sector", "Type"],
+                         as_index=False, sort=False)[MEASURES].sum()
+
+
+# Current state of every advert in the corpus store: soc_code, month, kept-chunk
+# counts per Type (same kept-chunk and kept-job rules as job_classification.py) and
+# a fingerprint of what the advert adds to the cube (0 when it adds nothing).
+# Counted in SQL over the attached store; only the per-job rows come back.
+def job_states(conn, types, data_types, min_similarity, term_threshold):
+    counts = ", ".join(f"SUM(Type = ?) AS {quote(t)}" for t in types)
+    selected = ", ".join(f"COALESCE(k.{quote(t)}, 0) AS {quote(t)}" for t in types)
+    states = pd.read_sql_query(f"""
+        SELECT a.jobId AS job_id, a.soc_code, COALESCE(substr(a.date, 1, 7), ?) AS month, {selected}
+        FROM store.adverts a
+        LEFT JOIN (SELECT job_id, {counts} FROM store.chunks
+                   WHERE similarity_to_data >= ? GROUP BY job_id) k ON k.job_id = a.jobId""",
+        conn, params=[UNDATED, *types, min_similarity])
+    states = states.drop_duplicates("job_id").reset_index(drop=True)
+    states[types] = states[types].astype("int64")
+
+    kept = (states[data_types].sum(axis=1) > term_threshold) & states["soc_code"].notna()
+    fingerprints = pd.util.hash_pandas_object(states[["soc_code", "month", *types]], index=False)
+    states["fingerprint"] = np.where(kept, fingerprints.to_numpy().view(np.int64), 0)
+    states["kept"] = kept
+    return states
+
+
+# Cells an advert state adds, with every measure multiplied by `sign`
+def _signed_cells(job_cells, types, conc, sign):
+    cells = cube_cells(job_cells, types, conc)
+    cells[MEASURES] = cells[MEASURES] * sign
+    return cells[["concordance", "month", "soc_code", "sector", "Type", *MEASURES]]
+
+
+def sync_cube(conn, store_path, types, data_types, min_similarity, term_threshold, conc):
+    """Bring the cube in line with the corpus store; returns (new, changed, removed) advert counts.
+
+    New adverts are added; adverts whose SOC, month or kept chunks changed have their
+    old contribution (kept in merged_counts) subtracted and the new one added;
+    adverts that left the store are subtracted.
+    """
+    conn.execute("ATTACH DATABASE ? AS store", (store_path,))
+    states = job_states(conn, types, data_types, min_similarity, term_threshold)
+    stored = pd.read_sql_query("SELECT job_id, fingerprint FROM merged_jobs", conn)
+    conn.execute("DETACH DATABASE store")
+
+    both = states[["job_id", "fingerprint"]].merge(stored, on="job_id", how="outer",
+                                                   suffixes=("", "_stored"), indicator=True)
+    new = both.loc[both["_merge"] == "left_only", "job_id"]
+    removed = both.loc[both["_merge"] == "right_only", "job_id"]
+    changed = both.loc[(both["_merge"] == "both") & (both["fingerprint"] != both["fingerprint_stored"]), "job_id"]
+
+    upsert = f"""
+        INSERT INTO cube (concordance, month, soc_code, sector, Type, {', '.join(MEASURES)})
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (concordance, month, soc_code, sector, Type) DO UPDATE SET
+        {', '.join(f'{m} = {m} + excluded.{m}' for m in MEASURES)}"""
+
+    # Each batch takes the same adverts out and puts them back, so an advert's old
+    # and new contribution are always handled together
+    touched = np.sort(pd.concat([new, changed, removed]).astype("int64").to_numpy())
+    incoming = states[states["job_id"].isin(pd.concat([new, changed]))].set_index("job_id")
+    for start in range(0, len(touched), MERGE_BATCH_JOBS):
+        batch_ids = touched[start:start + MERGE_BATCH_JOBS]
+        batch = incoming[incoming.index.isin(batch_ids)].reset_index()
+
+        # Old contribution of the adverts that changed or left
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS batch_jobs (job_id INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM temp.batch_jobs")
+        conn.executemany("INSERT INTO temp.batch_jobs VALUES (?)", ((int(j),) for j in batch_ids))
+        old = pd.read_sql_query("""
+            SELECT m.job_id, m.soc_code, m.month, c.Type, c.chunks
+            FROM merged_jobs m JOIN merged_counts c ON c.job_id = m.job_id
+            WHERE m.job_id IN (SELECT job_id FROM temp.batch_jobs)""", conn)
+        old = (old.pivot_table(index=["job_id", "soc_code", "month"], columns="Type", values="chunks",
+                               aggfunc="sum", fill_value=0)
+               .reindex(columns=types, fill_value=0).reset_index())
+        old.columns.name = None
+
+        kept = batch[batch["kept"]]
+        cells = pd.concat([_signed_cells(old, types, conc, -1.0),
+                           _signed_cells(kept[["job_id", "soc_code", "month", *types]], types, conc, 1.0)],
+                          ignore_index=True)
+        new_counts = kept.melt(id_vars="job_id", value_vars=types, var_name="Type", value_name="chunks")
+        new_counts = new_counts[new_counts["chunks"] > 0]
+
+        with conn:
+            conn.executemany(upsert, cells.itertuples(index=False))
+            conn.execute("DELETE FROM merged_counts WHERE job_id IN (SELECT job_id FROM temp.batch_jobs)")
+            conn.execute("DELETE FROM merged_jobs WHERE job_id IN (SELECT job_id FROM temp.batch_jobs)")
+            conn.executemany("INSERT INTO merged_jobs VALUES (?, ?, ?, ?)",
+                             ((int(j), int(f), s if isinstance(s, str) else None, m)
+                              for j, f, s, m in batch[["job_id", "fingerprint", "soc_code", "month"]]
+                              .itertuples(index=False)))
+            conn.executemany("INSERT INTO merged_counts VALUES (?, ?, ?)",
+                             ((int(j), t, int(c)) for j, t, c in new_counts.itertuples(index=False)))
+            # Cells whose adverts have all been taken out again
+            conn.execute("DELETE FROM cube WHERE ABS(jobs) < 1e-9")
+    return len(new), len(changed), len(removed)
+
+
+# ----------------------------
+# Readers
+# ----------------------------
+def monthly_sector_totals(conn, data_types, concordance, measure="weighted_chunks"):
+    """Dated, mapped cells of one concordance as month x sector rows with a column per Type."""
+    placeholders = ",".join("?" * len(data_types))
+    cells = pd.read_sql_query(f"""
+        SELECT month, sector, Type, SUM({quote(measure)}) AS value
+        FROM cube
+        WHERE concordance = ? AND month != ? AND sector != ? AND Type IN ({placeholders})
+        GROUP BY month, sector, Type""", conn, params=[concordance, UNDATED, UNMAPPED, *data_types])
+    monthly = (cells.pivot_table(index=["month", "sector"], columns="Type", values="value",
+                                 aggfunc="sum", fill_value=0.0)
+               .reindex(columns=data_types, fill_value=0.0))
+    monthly.columns.name = None
+    return monthly.reset_index()
+
+
+def rolling_totals(monthly, columns, window):
+    """Trailing `window`-month sums per sector, with months that have no adverts counted as 0."""
+    if monthly.empty:
+        return monthly.assign(**{f"{c}_rolling": pd.Series(dtype=float) for c in columns})
+    months = pd.PeriodIndex(monthly["month"], freq="M")
+    full_range = pd.period_range(months.min(), months.max(), freq="M")
+    frames = []
+    for sector, group in monthly.assign(month=months).groupby("sector", sort=False):
+        group = group.set_index("month")[columns].reindex(full_range, fill_value=0.0)
+        rolled = group.rolling(window, min_periods=1).sum().add_suffix("_rolling")
+        frame = pd.concat([group, rolled], axis=1).rename_axis("month").reset_index()
+        frame.insert(1, "sector", sector)
+        frames.append(frame)
+    result = pd.concat(frames, ignore_index=True)
+    result["month"] = result["month"].astype(str)
+    return result.sort_values(["month", "sector"]).reset_index(drop=True)
+
+
+# ----------------------------
+# Script: merge new adverts from the corpus store into the cube
+# ----------------------------
+def main():
+    from job_classification import (TYPES, DATA_TYPES, SIMILARITY_THRESHOLD, DATA_TERM_THRESHOLD,
+                                    TAGGER, RULES_PATH, PROTOTYPES_PATH)
+
+    if not os.path.exists(STORE_PATH):
+        raise FileNotFoundError(f"{STORE_PATH} not found; build it with corpus_store.py first")
+    started = time.perf_counter()
+    conc = load_concordance(CONCORDANCE_PATH)
+    conn = open_cube(CUBE_PATH)
+
+    key = config_key(TYPES, SIMILARITY_THRESHOLD, DATA_TERM_THRESHOLD, conc,
+                     [RULES_PATH] if TAGGER == "rules" else [PROTOTYPES_PATH])
+    row = conn.execute("SELECT value FROM meta WHERE name = 'config'").fetchone()
+    if FULL_REBUILD or row is None or row[0] != key:
+        print("🧱 Rebuilding the cube from the whole corpus")
+        reset_cube(conn)
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('config', ?)", (key,))
+
+    n_new, n_changed, n_removed = sync_cube(conn, STORE_PATH, TYPES, DATA_TYPES, SIMILARITY_THRESHOLD,
+                                            DATA_TERM_THRESHOLD, conc)
+    n_cells = conn.execute("SELECT COUNT(*) FROM cube").fetchone()[0]
+    conn.close()
+    print(f"🧊 {n_new} new, {n_changed} changed and {n_removed} removed adverts merged into "
+          f"{n_cells} cube cells in {time.perf_counter() - started:.1f}s")
+    print(f"✅ Cube saved to: {CUBE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
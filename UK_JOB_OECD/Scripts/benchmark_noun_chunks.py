@@ -0,0 +1,56 @@
+import time
+
+import pandas as pd
+
+from bgt_gb_noun_chunks import (INPUT_FILE, BATCH_SIZE, clean_descriptions,
+                                load_model, extract_chunks)
+from schemas import read_parquet
+
+# Compare the "full" and "fast" extraction profiles on the same sample of adverts
+SAMPLE_SIZE = 2000
+N_PROCESS = 1  # keep at 1 so both profiles are timed on a single core
+PROFILES = ["full", "fast"]
+
+
+def run_profile(profile, descriptions):
+    started = time.perf_counter()
+    texts = clean_descriptions(descriptions, profile)
+    clean_seconds = time.perf_counter() - started
+
+    nlp, disabled = load_model(profile)
+    started = time.perf_counter()
+    chunks = set()
+    for doc, i in nlp.pipe(zip(texts, range(len(texts))), as_tuples=True, disable=disabled,
+                           n_process=N_PROCESS, batch_size=BATCH_SIZE):
+        chunks.update((i, chunk.text.lower()) for chunk in extract_chunks(doc))
+    parse_seconds = time.perf_counter() - started
+
+    return {
+        "profile": profile,
+        "pipeline": "+".join(c for c in nlp.pipe_names if c not in disabled),
+        "chars": int(texts.str.len().sum()),
+        "clean_s": round(clean_seconds, 3),
+        "parse_s": round(parse_seconds, 2),
+        "adverts_per_s": round(len(texts) / parse_seconds, 1),
+        "chunks": len(chunks)
+    }, chunks
+
+
+df = read_parquet(INPUT_FILE, columns=["jobDescription"]).dropna(subset=["jobDescription"])
+sample = df["jobDescription"].sample(min(SAMPLE_SIZE, len(df)), random_state=42).reset_index(drop=True)
+
+results, chunk_sets = [], {}
+for profile in PROFILES:
+    print(f"⏱️ Running {profile} profile on {len(sample)} adverts...")
+    result, chunk_sets[profile] = run_profile(profile, sample)
+    results.append(result)
+
+summary = pd.DataFrame(results).set_index("profile")
+print(summary.to_string())
+
+# How much of the full profile's chunk output the fast profile reproduces
+full, fast = chunk_sets["full"], chunk_sets["fast"]
+print(f"\nShared chunks: {len(full & fast)} "
+      f"(recall vs full {len(full & fast) / max(len(full), 1):.1%}, "
+      f"jaccard {len(full & fast) / max(len(full | fast), 1):.1%})")
+print(f"Speed-up: {summary.loc['fast', 'adverts_per_s'] / summary.loc['full', 'adverts_per_s']:.2f}x")
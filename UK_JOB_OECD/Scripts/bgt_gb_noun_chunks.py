@@ -1,46 +1,214 @@
+import html
+import os
+import shutil
+import sys
+
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 import spacy
 
-# Load CSV directly (your 2022 job data)
-df = pd.read_csv("/Users/saurabhkumar/Desktop/UK_JOB_OECD/Data/enriched_with_soc.csv")
+from chunk_vector_cache import ChunkVectorCache, normalise_chunk
+from paths import DATA_DIR, SCRIPTS_DIR
+from schemas import JOBS, apply_schema, chunks_schema, read_parquet, to_arrow
+
+# Near-duplicate adverts removed by dedup_adverts.py (use enriched_with_soc.parquet to skip that step)
+INPUT_FILE = os.path.join(DATA_DIR, "enriched_with_soc_dedup.parquet")
+
+# Output: one row per job, plus one row per chunk that only references job_id
+JOBS_FILE = os.path.join(SCRIPTS_DIR, "noun_chunks_jobs.parquet")
+CHUNKS_DIR = os.path.join(SCRIPTS_DIR, "noun_chunks_with_similarity")  # Parquet dataset, one part per shard
+
+# Extraction profile:
+#   "full" - digits removed, full en_core_web_lg pipeline loaded (ner/lemmatizer disabled)
+#   "fast" - HTML/boilerplate stripped, whitespace collapsed, text capped at MAX_CHARS,
+#            and only the components noun_chunks needs are loaded
+PROFILE = "full"
+MODEL_NAME = "en_core_web_lg"
+MAX_CHARS = 5000
+# en_core_web_* components that noun_chunks (tok2vec, tagger, attribute_ruler, parser)
+# and the static vectors never touch
+FAST_EXCLUDE = ["ner", "lemmatizer", "senter"]
+CLEAN_CACHE_DIR = os.path.join(SCRIPTS_DIR, "clean_description_cache")
+
+# Streaming settings: peak memory depends on BATCH_SIZE / SHARD_SIZE, not corpus size
+N_PROCESS = max(1, (os.cpu_count() or 1) - 1)  # spaCy worker processes
+BATCH_SIZE = 256      # docs per nlp.pipe batch
+SHARD_SIZE = 5000     # adverts per output shard
+
+# Terms every chunk is compared to; each one gets a similarity_to_<term> column
+TARGET_TERMS = ["data"]  # e.g. ["data", "database", "analytics"]
+SIMILARITY_COLUMNS = ["similarity_to_" + term.replace(" ", "_") for term in TARGET_TERMS]
+
+# Persistent cache of chunk vectors, so repeat chunks skip the vector work across runs
+USE_CHUNK_CACHE = True
+CHUNK_CACHE_DIR = os.path.join(SCRIPTS_DIR, "chunk_vector_cache")
+CHUNK_CACHE_MAX_ENTRIES = 500_000  # least recently used chunks are evicted past this
+
+JOB_COLUMNS = {"jobId": "job_id", "jobTitle": "title", "soc_code": "soc_code",
+               "jobDescription": "description", "date": "date"}
+CHUNK_COLUMNS = ["job_id", "noun_chunk", *SIMILARITY_COLUMNS]
+
+# Every character str.isdigit() accepts, so translate() strips exactly what the
+# old per-character filter did
+DIGITS = str.maketrans("", "", "".join(
+    c for c in map(chr, range(sys.maxunicode + 1)) if c.isdigit()))
+HTML_TAG = r"<[^>]+>"
+
+# Clean the whole description column at once (vectorised string ops)
+def clean_descriptions(descriptions, profile=PROFILE):
+    text = descriptions.fillna("").astype(str)
+    if profile == "fast":
+        text = text.str.replace(HTML_TAG, " ", regex=True).map(html.unescape)
+    text = text.str.translate(DIGITS)
+    if profile == "fast":
+        text = text.str.replace(r"\s+", " ", regex=True).str.strip().str.slice(0, MAX_CHARS)
+    return text
+
+# Cleaned text is cached on disk, keyed by a hash of the raw description, so
+# reruns and incremental batches only clean adverts they have not seen
+def cached_clean_descriptions(descriptions, profile=PROFILE):
+    path = os.path.join(CLEAN_CACHE_DIR, f"{profile}_{MAX_CHARS}.parquet")
+    keys = pd.util.hash_pandas_object(descriptions.astype(str), index=False)
+    cache = pd.read_parquet(path) if os.path.exists(path) else \
+        pd.DataFrame({"key": pd.Series(dtype="uint64"), "clean": pd.Series(dtype=str)})
+
+    lookup = pd.Series(cache["clean"].to_numpy(), index=cache["key"].to_numpy())
+    clean = keys.map(lookup).to_numpy(dtype=object)
+    missing = pd.isna(clean)
+    if missing.any():
+        new_clean = clean_descriptions(descriptions[missing], profile).to_numpy(dtype=object)
+        clean[missing] = new_clean
+        new_rows = pd.DataFrame({"key": keys[missing].to_numpy(), "clean": new_clean})
+        os.makedirs(CLEAN_CACHE_DIR, exist_ok=True)
+        pd.concat([cache, new_rows]).drop_duplicates("key").to_parquet(path, index=False)
+    return pd.Series(clean, index=descriptions.index)
+
+# Load the model: the fast profile never loads the components noun_chunks doesn't use
+def load_model(profile=PROFILE):
+    if profile == "fast":
+        return spacy.load(MODEL_NAME, exclude=FAST_EXCLUDE), []
+    return spacy.load(MODEL_NAME), ["ner", "lemmatizer"]
+
+# Unit-length target vectors, one row per term (multi-word terms use the mean vector)
+def target_matrix(nlp):
+    targets = np.vstack([nlp.make_doc(term).vector for term in TARGET_TERMS]).astype(np.float32)
+    return targets / np.linalg.norm(targets, axis=1, keepdims=True)
+
+# Extract noun chunks for one parsed description
+def extract_chunks(doc):
+    return [chunk for chunk in doc.noun_chunks if chunk.has_vector]
+
+# Unit vectors for a batch of chunks, computing only the ones not in the cache
+def chunk_unit_vectors(chunks, cache):
+    keys = [normalise_chunk(chunk.text) for chunk in chunks]
+    known = cache.get_many(set(keys)) if cache is not None else {}
+
+    new = {}
+    for key, chunk in zip(keys, chunks):
+        if key not in known and key not in new:
+            new[key] = chunk.vector
+    if new:
+        matrix = np.asarray(list(new.values()), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)  # zero vectors score 0, as in spaCy
+        if cache is not None:
+            cache.put_many(list(new), matrix)
+        known.update(zip(new, matrix))
+
+    return np.vstack([known[key] for key in keys])
+
+# Cosine similarity for a whole batch of chunks against every target in one product
+def score_batch(positions, chunks, targets, cache, job_ids):
+    batch = pd.DataFrame({
+        "job_id": job_ids[positions],
+        "noun_chunk": pd.Categorical([chunk.text for chunk in chunks])
+    })
+    similarities = chunk_unit_vectors(chunks, cache) @ targets.T
+    for j, column in enumerate(SIMILARITY_COLUMNS):
+        batch[column] = similarities[:, j].astype(np.float32)
+    return batch
+
+# Write one shard as a Parquet part. Chunk text is stored dictionary-encoded with
+# int32 indices in every part (empty ones included), whatever the shard's number of
+# distinct chunks, so the parts always read back as one dataset
+def flush_shard(batches, shard_no):
+    path = os.path.join(CHUNKS_DIR, f"part-{shard_no:05d}.parquet")
+    if batches:
+        shard = pd.concat(batches, ignore_index=True)
+    else:
+        shard = pd.DataFrame({"job_id": pd.Series(dtype="int64"),
+                              "noun_chunk": pd.Series(dtype=object),
+                              **{c: pd.Series(dtype="float32") for c in SIMILARITY_COLUMNS}})
+    pq.write_table(to_arrow(shard[CHUNK_COLUMNS], chunks_schema(SIMILARITY_COLUMNS)), path)
+    return path
+
+
+# Job columns plus duplicate_count when the input went through dedup_adverts.py
+def input_columns(path):
+    available = set(pq.read_schema(path).names)
+    return [c for c in [*JOB_COLUMNS, "duplicate_count"] if c in available]
+
+
+def main():
+    # Load only the columns this stage uses (your 2022 job data)
+    df = read_parquet(INPUT_FILE, columns=input_columns(INPUT_FILE))
+
+    # Drop rows with missing descriptions (optional but useful)
+    df.dropna(subset=["jobDescription"], inplace=True)
+    df.reset_index(drop=True, inplace=True)
+
+    df["clean_description"] = cached_clean_descriptions(df["jobDescription"])
 
-# Drop rows with missing descriptions (optional but useful)
-df.dropna(subset=["jobDescription"], inplace=True)
+    # Load SpaCy model
+    nlp, disabled = load_model()
+    targets = target_matrix(nlp)  # the words you compare to
+    cache = ChunkVectorCache(CHUNK_CACHE_DIR, nlp, CHUNK_CACHE_MAX_ENTRIES) if USE_CHUNK_CACHE else None
 
-# Remove numbers from text
-def remove_numbers(text):
-    return ''.join(filter(lambda c: not c.isdigit(), str(text)))
+    # Job table: written once, straight from the input columns
+    jobs = df[list(JOB_COLUMNS)].rename(columns=JOB_COLUMNS)
+    if "duplicate_count" in df.columns:
+        jobs["duplicate_count"] = df["duplicate_count"].to_numpy()  # adverts each job stands for
+    apply_schema(jobs, JOBS).to_parquet(JOBS_FILE, index=False)
+    job_ids = df["jobId"].to_numpy()
 
-df["clean_description"] = df["jobDescription"].apply(remove_numbers)
+    # Start from an empty chunk folder so old parts never leak into the output
+    shutil.rmtree(CHUNKS_DIR, ignore_errors=True)
+    os.makedirs(CHUNKS_DIR)
 
-# Load SpaCy model
-nlp = spacy.load("en_core_web_lg")  # use 'en_core_web_lg' if available
-target_token = nlp("data")[0]  # this is the word you compare to
+    # Process descriptions as a stream: each doc is dropped once its chunks are extracted
+    texts = zip(df["clean_description"], range(len(df)))
+    docs = nlp.pipe(texts, as_tuples=True, disable=disabled,
+                    n_process=N_PROCESS, batch_size=BATCH_SIZE)
 
-# Process descriptions
-docs = list(nlp.pipe(df["clean_description"], disable=["ner", "lemmatizer"]))
+    output = []
+    positions, chunks = [], []
+    shard_no = 0
+    for n, (doc, i) in enumerate(docs, start=1):
+        doc_chunks = extract_chunks(doc)
+        positions.extend([i] * len(doc_chunks))
+        chunks.extend(doc_chunks)
+        if chunks and (n % BATCH_SIZE == 0 or n % SHARD_SIZE == 0):
+            output.append(score_batch(positions, chunks, targets, cache, job_ids))
+            positions, chunks = [], []
+        if n % SHARD_SIZE == 0:
+            flush_shard(output, shard_no)
+            print(f"💾 Shard {shard_no} written ({n}/{len(df)} adverts)")
+            output = []
+            shard_no += 1
 
-# Extract noun chunks + cosine similarity
-output = []
+    if chunks:
+        output.append(score_batch(positions, chunks, targets, cache, job_ids))
+    if output or shard_no == 0:
+        flush_shard(output, shard_no)
 
-for i, doc in enumerate(docs):
-    for chunk in doc.noun_chunks:
-        if chunk.has_vector:
-            output.append({
-                "job_id": df.iloc[i]["jobId"],
-                "title": df.iloc[i]["jobTitle"],
-                "noun_chunk": chunk.text,
-                "similarity_to_data": chunk.similarity(target_token),
-                "soc_code": df.iloc[i]["soc_code"],
-                "description": df.iloc[i]["jobDescription"],
-                "date": df.iloc[i]["date"]
-            })
+    if cache is not None:
+        print(f"🧠 Chunk vector cache: {cache.hits} hits, {cache.misses} misses")
+        cache.close()
 
-# Save result as a DataFrame
-result_df = pd.DataFrame(output)
+    print(f"Done! Results saved to {JOBS_FILE} and {CHUNKS_DIR}/")
 
-# Optional: Save to Parquet or CSV
-result_df.to_csv("noun_chunks_with_similarity.csv", index=False)
-# result_df.to_parquet("noun_chunks_with_similarity.parquet", index=False)
 
-print("Done! Results saved.")
\ No newline at end of file
+# spaCy's worker processes re-import this file, so the work must sit behind main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from chunk_tagging import OTHER
+from chunk_vector_cache import model_key, normalise_chunk
+
+
+# Load the Type -> seed phrases file; the order Types first appear in is the column order
+def load_seed_phrases(path):
+    seeds_df = pd.read_csv(path, dtype=str).dropna()
+    seeds = {}
+    for chunk_type, phrase in zip(seeds_df["Type"], seeds_df["phrase"]):
+        seeds.setdefault(chunk_type.strip(), []).append(phrase.strip())
+    return seeds
+
+
+# Unit-length vectors for chunk texts, reusing the chunk vector cache that
+# bgt_gb_noun_chunks.py fills (a chunk's vector is the mean of its token vectors)
+def unit_vectors(texts, nlp, cache=None):
+    keys = [normalise_chunk(text) for text in texts]
+    known = cache.get_many(set(keys)) if cache is not None else {}
+
+    new = [key for key in dict.fromkeys(keys) if key not in known]
+    if new:
+        matrix = np.asarray([nlp.make_doc(key).vector for key in new], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        if cache is not None:
+            cache.put_many(new, matrix)
+        known.update(zip(new, matrix))
+
+    if not keys:
+        return np.zeros((0, nlp.vocab.vectors_length), dtype=np.float32)
+    return np.vstack([known[key] for key in keys])
+
+
+# One unit-length centroid per Type from its seed phrases. Built once per model
+# and seed list, then loaded from cache_dir (.npy named by model + seed hash).
+def prototype_matrix(nlp, seeds, cache_dir):
+    digest = hashlib.sha1(repr(sorted(seeds.items())).encode("utf-8")).hexdigest()[:12]
+    path = os.path.join(cache_dir, f"{model_key(nlp)}_{digest}.npy")
+    if os.path.exists(path):
+        return np.load(path)
+
+    prototypes = np.vstack([unit_vectors(phrases, nlp).mean(axis=0) for phrases in seeds.values()])
+    norms = np.linalg.norm(prototypes, axis=1, keepdims=True)
+    prototypes = (prototypes / np.where(norms == 0, 1, norms)).astype(np.float32)
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(path, prototypes)
+    return prototypes
+
+
+# Assign every chunk to its nearest prototype with one (chunks x Types) product.
+# margin = best minus second-best cosine similarity; chunks whose best similarity
+# or margin falls below the cut-offs go to "other". Like tag_chunks, only the
+# distinct chunk texts are scored, then the result is broadcast back.
+def classify_chunks(chunks, nlp, prototypes, types, cache=None, min_similarity=0.0, min_margin=0.0):
+    all_types = list(types) + [OTHER]
+    categories = pd.Categorical(chunks.astype(str))
+    similarities = unit_vectors(categories.categories, nlp, cache) @ prototypes.T
+
+    if len(types) > 1:
+        top_two = -np.partition(-similarities, 1, axis=1)[:, :2]
+        margin = top_two[:, 0] - top_two[:, 1]
+    else:
+        margin = np.zeros(len(similarities), dtype=np.float32)
+    best = similarities.argmax(axis=1)
+    fits = (similarities.max(axis=1) >= min_similarity) & (margin >= min_margin)
+    codes = np.where(fits, best, len(all_types) - 1)
+
+    # Missing chunks (code -1) pick up the trailing "other" / zero-margin entry
+    chunk_codes = np.append(codes, len(all_types) - 1)[categories.codes]
+    chunk_margin = np.append(margin, 0).astype(np.float32)[categories.codes]
+    return (pd.Series(pd.Categorical.from_codes(chunk_codes, categories=all_types), index=chunks.index),
+            pd.Series(chunk_margin, index=chunks.index))
@@ -0,0 +1,56 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+OTHER = "other"
+
+
+# Load the Type -> substring rules; the order Types first appear in is their priority
+def load_rules(path):
+    rules_df = pd.read_csv(path, dtype=str).dropna()
+    rules = {}
+    for chunk_type, pattern in zip(rules_df["Type"], rules_df["pattern"]):
+        rules.setdefault(chunk_type.strip(), []).append(pattern.strip().lower())
+    return rules
+
+
+# One compiled regex per Type, built once
+def compile_rules(rules):
+    return {
+        chunk_type: re.compile("|".join(re.escape(p) for p in patterns), flags=re.IGNORECASE)
+        for chunk_type, patterns in rules.items()
+    }
+
+
+def chunk_types(rules):
+    return list(rules) + [OTHER]
+
+
+# Tag every chunk in one vectorised pass per Type, keeping the if/elif priority.
+# Only the distinct chunk texts are matched, then the result is broadcast back.
+def tag_chunks(chunks, compiled):
+    types = list(compiled) + [OTHER]
+    categories = pd.Categorical(chunks.astype(str))
+    texts = pd.Series(categories.categories)
+
+    codes = np.full(len(texts), len(types) - 1)
+    untagged = np.ones(len(texts), dtype=bool)
+    for code, pattern in enumerate(compiled.values()):
+        hit = texts.str.contains(pattern, regex=True).to_numpy() & untagged
+        codes[hit] = code
+        untagged &= ~hit
+
+    chunk_codes = np.where(categories.codes >= 0, codes[categories.codes], len(types) - 1)
+    return pd.Series(pd.Categorical.from_codes(chunk_codes, categories=types), index=chunks.index)
+
+
+# Chunk counts per job and Type from a categorical groupby (every Type gets a column)
+def count_by_job(job_ids, types, all_types):
+    counts = (pd.DataFrame({"job_id": job_ids.to_numpy(), "Type": types.to_numpy()})
+              .groupby(["job_id", "Type"], observed=True).size()
+              .unstack("Type", fill_value=0)
+              .reindex(columns=all_types, fill_value=0))
+    counts.columns = counts.columns.astype(str)
+    counts.columns.name = None
+    return counts
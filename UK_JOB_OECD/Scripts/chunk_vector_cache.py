@@ -0,0 +1,135 @@
+import os
+import re
+import sqlite3
+
+import numpy as np
+
+_whitespace = re.compile(r"\s+")
+
+
+def normalise_chunk(text):
+    # Only whitespace is normalised: en_core_web_lg vectors are case-sensitive,
+    # so lowercasing would change the scores of cached chunks.
+    return _whitespace.sub(" ", text).strip()
+
+
+def model_key(nlp):
+    meta = nlp.meta
+    return f"{meta.get('lang', 'xx')}_{meta.get('name', 'model')}-{meta.get('version', '0')}"
+
+
+class ChunkVectorCache:
+    """On-disk cache of unit-length chunk vectors for one spaCy model version.
+
+    Vectors live in a memory-mapped float32 array (vectors.f32) and a SQLite
+    table maps chunk text -> row. The array grows by doubling up to
+    `max_entries`; after that the least recently used rows are reused.
+    Each model name/version gets its own folder, so upgrading the model
+    never serves stale vectors.
+    """
+
+    def __init__(self, directory, nlp, max_entries=500_000, initial_entries=16_384):
+        self.directory = os.path.join(directory, model_key(nlp))
+        os.makedirs(self.directory, exist_ok=True)
+        self.dim = nlp.vocab.vectors_length
+        self.max_entries = max_entries
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+
+        self.conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite"))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                key TEXT PRIMARY KEY, row INTEGER NOT NULL, last_used INTEGER NOT NULL);
+            CREATE INDEX IF NOT EXISTS chunks_last_used ON chunks (last_used);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        """)
+        self.clock = self._meta("clock", 0)
+        self.next_row = self._meta("next_row", 0)
+        self.capacity = self._meta("capacity", min(initial_entries, max_entries))
+        self._open_vectors()
+        self.hits = self.misses = 0
+
+    def _meta(self, name, default):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def _open_vectors(self):
+        size = self.capacity * self.dim * 4
+        with open(self.vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+",
+                                 shape=(self.capacity, self.dim))
+
+    def _grow(self, needed):
+        self.vectors.flush()
+        del self.vectors
+        while self.capacity < needed and self.capacity < self.max_entries:
+            self.capacity = min(self.capacity * 2, self.max_entries)
+        self._open_vectors()
+
+    def get_many(self, keys):
+        """Return {key: vector} for the keys already cached, marking them as used."""
+        self.clock += 1  # one tick per batch, for least-recently-used eviction
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT key, row FROM chunks WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            found.update(rows)
+        if found:
+            with self.conn:
+                self.conn.executemany("UPDATE chunks SET last_used = ? WHERE key = ?",
+                                      ((self.clock, key) for key in found))
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        if not found:
+            return {}
+        rows = np.fromiter(found.values(), dtype=np.int64, count=len(found))
+        vectors = np.asarray(self.vectors[rows])
+        return dict(zip(found.keys(), vectors))
+
+    def _allocate(self, n):
+        rows = []
+        free = min(n, self.max_entries - self.next_row)
+        if free > 0:
+            if self.next_row + free > self.capacity:
+                self._grow(self.next_row + free)
+            rows.extend(range(self.next_row, self.next_row + free))
+            self.next_row += free
+        if len(rows) < n:
+            # Full: evict the least recently used entries and reuse their rows
+            evicted = self.conn.execute(
+                "SELECT key, row FROM chunks WHERE last_used < ? ORDER BY last_used LIMIT ?",
+                (self.clock, n - len(rows))
+            ).fetchall()
+            self.conn.executemany("DELETE FROM chunks WHERE key = ?", ((k,) for k, _ in evicted))
+            rows.extend(row for _, row in evicted)
+        return rows
+
+    def put_many(self, keys, vectors):
+        """Store unit vectors for new keys (anything that does not fit is skipped)."""
+        with self.conn:
+            rows = self._allocate(len(keys))
+            n = len(rows)
+            if n:
+                self.vectors[rows] = vectors[:n]
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO chunks (key, row, last_used) VALUES (?, ?, ?)",
+                    zip(keys[:n], rows, [self.clock] * n)
+                )
+            self._save_meta()
+
+    def _save_meta(self):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+            [("clock", self.clock), ("next_row", self.next_row), ("capacity", self.capacity)]
+        )
+
+    def close(self):
+        self.vectors.flush()
+        with self.conn:
+            self._save_meta()
+        self.conn.close()
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+DEFAULT_CONCORDANCE = "default"
+
+
+def normalise_soc(codes):
+    # "2425.0" -> "2425": SOC codes must stay strings even if a CSV stored them as floats
+    return pd.Series(codes).astype(str).str.split(".").str[0].to_numpy()
+
+
+# Load a (possibly many-to-many) SOC -> sector concordance.
+# Columns: soc_code, sector, optional weight (e.g. employment) and optional
+# concordance (vintage / SIC granularity label, so several can share one file).
+# Weights are normalised so each SOC's weights sum to 1 within a concordance;
+# without a weight column a SOC is split equally across its sectors.
+def load_concordance(path):
+    conc = pd.read_csv(path, dtype={"soc_code": str, "sector": str})
+    conc["soc_code"] = normalise_soc(conc["soc_code"])
+    if "weight" not in conc.columns:
+        conc["weight"] = 1.0
+    if "concordance" not in conc.columns:
+        conc["concordance"] = DEFAULT_CONCORDANCE
+    conc = conc.groupby(["concordance", "soc_code", "sector"], as_index=False, sort=False)["weight"].sum()
+    conc["weight"] = conc["weight"] / conc.groupby(["concordance", "soc_code"])["weight"].transform("sum")
+    return conc
+
+
+# SUT figures as a lookup indexed by sector
+def load_sut(path):
+    return pd.read_csv(path, dtype={"sector": str}).set_index("sector")
+
+
+# Sparse SOC x (concordance, sector) weight matrix covering every concordance at once
+def concordance_matrix(conc, soc_codes):
+    soc_pos = pd.Index(soc_codes).get_indexer(conc["soc_code"])
+    mapped = conc[soc_pos >= 0]
+    columns = pd.MultiIndex.from_frame(conc[["concordance", "sector"]].drop_duplicates())
+    col_pos = columns.get_indexer(pd.MultiIndex.from_frame(mapped[["concordance", "sector"]]))
+    matrix = sparse.csr_matrix(
+        (mapped["weight"].to_numpy(), (soc_pos[soc_pos >= 0], col_pos)),
+        shape=(len(soc_codes), len(columns))
+    )
+    return matrix, columns
+
+
+# Sector totals for every concordance from one sparse product: W.T @ X
+def sector_totals(df_soc, conc, value_columns):
+    soc_codes = normalise_soc(df_soc["soc_code"])
+    matrix, columns = concordance_matrix(conc, soc_codes)
+    values = df_soc[value_columns].to_numpy(dtype=np.float64)
+    totals = pd.DataFrame(matrix.T @ values, index=columns, columns=value_columns)
+
+    # Share of each value column no sector received (SOCs missing from a concordance);
+    # 0 for a column that is all zeros
+    unmapped = (1 - totals.groupby(level="concordance").sum() / values.sum(axis=0)).fillna(0.0)
+    return totals.reset_index(), unmapped
+
+
+# Sparse job x (concordance, sector) matrix: each job's value spread over the
+# sectors of its SOC with the concordance weights
+def job_sector_matrix(job_soc_codes, job_values, conc):
+    soc_codes, soc_idx = np.unique(normalise_soc(job_soc_codes), return_inverse=True)
+    jobs_by_soc = sparse.csr_matrix(
+        (np.asarray(job_values, dtype=np.float64), (np.arange(len(soc_idx)), soc_idx)),
+        shape=(len(soc_idx), len(soc_codes))
+    )
+    matrix, columns = concordance_matrix(conc, soc_codes)
+    return (jobs_by_soc @ matrix).tocsr(), columns
+
+
+# Bootstrap replicates of the column totals of a job x sector matrix. Each
+# replicate resamples jobs with replacement, i.e. multinomial counts over jobs,
+# so a block of replicates is one product: counts (block x jobs) @ matrix.
+# Blocks only bound memory; max_cells caps the size of the counts array.
+def bootstrap_totals(matrix, n_replicates, max_cells=20_000_000, seed=42):
+    rng = np.random.default_rng(seed)
+    n_jobs = matrix.shape[0]
+    if n_jobs == 0:
+        return np.zeros((n_replicates, matrix.shape[1]))
+    block_size = max(1, max_cells // n_jobs)
+    pvals = np.full(n_jobs, 1 / n_jobs)
+    replicates = []
+    for start in range(0, n_replicates, block_size):
+        counts = rng.multinomial(n_jobs, pvals, size=min(block_size, n_replicates - start))
+        replicates.append((matrix.T @ counts.T).T)
+    return np.vstack(replicates)
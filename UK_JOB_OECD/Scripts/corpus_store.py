@@ -0,0 +1,251 @@
+import os
+import sqlite3
+import time
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from paths import DATA_DIR, SCRIPTS_DIR
+from schemas import read_parquet
+
+# One SQLite file holding the adverts, every noun chunk (with its Type) and the
+# job-level / SOC-level tables, indexed for slicing by jobId, soc_code, date and Type.
+# Rebuilt from the Parquet outputs by running this script after job_classification.py.
+STORE_PATH = os.path.join(DATA_DIR, "corpus.sqlite")
+ADVERTS_PATH = os.path.join(DATA_DIR, "enriched_with_soc_dedup.parquet")
+CHUNKS_PATH = os.path.join(SCRIPTS_DIR, "noun_chunks_with_similarity")
+JOB_LEVEL_PATH = os.path.join(DATA_DIR, "job_level_aggregated.parquet")
+SOC_LEVEL_PATH = os.path.join(DATA_DIR, "soc_level_aggregated.parquet")
+
+LOAD_BATCH_ROWS = 500_000
+REED_DATE_FORMAT = "%d/%m/%Y"  # dates are stored as ISO text so ranges use the index
+
+INDEXES = [
+    "CREATE INDEX idx_adverts_job ON adverts (jobId)",
+    "CREATE INDEX idx_adverts_soc_date ON adverts (soc_code, date)",
+    "CREATE INDEX idx_adverts_date ON adverts (date)",
+    "CREATE INDEX idx_chunks_job ON chunks (job_id)",
+    "CREATE INDEX idx_chunks_type ON chunks (Type, job_id)",
+    "CREATE INDEX idx_job_level_job ON job_level (job_id)",
+    "CREATE INDEX idx_soc_level_soc ON soc_level (soc_code)",
+]
+
+
+def quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def connect(path=STORE_PATH):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found; build it with corpus_store.py first")
+    return sqlite3.connect(path)
+
+
+# Categories go in as plain text and Reed's dd/mm/yyyy dates as yyyy-mm-dd
+def _sql_frame(df):
+    df = df.copy()
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(object)
+    for column in ["date", "expirationDate"]:
+        if column in df.columns:
+            parsed = pd.to_datetime(df[column], format=REED_DATE_FORMAT, errors="coerce")
+            df[column] = parsed.dt.strftime("%Y-%m-%d").where(parsed.notna(), None)
+    return df
+
+
+# ----------------------------
+# Build
+# ----------------------------
+def build_store(path, adverts, chunk_batches, job_level, soc_level):
+    """Write a fresh store to `path` (swapped in only once it is complete).
+
+    chunk_batches yields DataFrames of job_id, noun_chunk, similarity_to_data,
+    Type (and type_margin with the prototype tagger).
+    """
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+
+    _sql_frame(adverts).to_sql("adverts", conn, index=False)
+    n_chunks = 0
+    for batch in chunk_batches:
+        _sql_frame(batch).to_sql("chunks", conn, index=False, if_exists="append")
+        n_chunks += len(batch)
+    _sql_frame(job_level).to_sql("job_level", conn, index=False)
+    _sql_frame(soc_level).to_sql("soc_level", conn, index=False)
+    for statement in INDEXES:
+        conn.execute(statement)
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+    os.replace(tmp_path, path)
+    return n_chunks
+
+
+# ----------------------------
+# Queries
+# ----------------------------
+def _job_filter(start=None, end=None, soc_code=None):
+    """SQL restricting chunks to adverts by date range [start, end) and SOC, plus its params."""
+    conditions, params = [], []
+    if start is not None:
+        conditions.append("date >= ?")
+        params.append(str(start))
+    if end is not None:
+        conditions.append("date < ?")
+        params.append(str(end))
+    if soc_code is not None:
+        conditions.append("soc_code = ?")
+        params.append(str(soc_code))
+    if not conditions:
+        return "", []
+    return f" AND job_id IN (SELECT jobId FROM adverts WHERE {' AND '.join(conditions)})", params
+
+
+def _job_level_sql(types, data_types, min_similarity, term_threshold, start=None, end=None, soc_code=None):
+    counts = ", ".join(f"SUM(Type = ?) AS {quote(t)}" for t in types)
+    data_total = " + ".join(quote(t) for t in data_types) or "0"
+    job_filter, filter_params = _job_filter(start, end, soc_code)
+    sql = f"""
+        SELECT * FROM (
+            SELECT *, {data_total} AS Count_DataTerms FROM (
+                SELECT job_id, {counts}, COUNT(*) AS n_chunks
+                FROM chunks
+                WHERE similarity_to_data >= ?{job_filter}
+                GROUP BY job_id
+            )
+        )
+        WHERE Count_DataTerms > ?"""
+    return sql, [*types, min_similarity, *filter_params, term_threshold]
+
+
+def job_level_query(conn, types, data_types, min_similarity, term_threshold, **job_filter):
+    """job_level_aggregated, computed inside the store (same columns as job_classification.py)."""
+    sql, params = _job_level_sql(types, data_types, min_similarity, term_threshold, **job_filter)
+    df = pd.read_sql_query(sql + " ORDER BY job_id", conn, params=params)
+    return df.drop(columns="n_chunks")
+
+
+def soc_level_query(conn, types, data_types, min_similarity, term_threshold, **job_filter):
+    """soc_level_aggregated, computed inside the store.
+
+    As in job_classification.py, each kept job adds its data counts once per
+    kept chunk, and the job_id column counts kept chunks.
+    """
+    sql, params = _job_level_sql(types, data_types, min_similarity, term_threshold, **job_filter)
+    sums = ", ".join(f"SUM(j.{quote(t)} * j.n_chunks) AS {quote(t)}" for t in data_types)
+    df = pd.read_sql_query(f"""
+        WITH j AS ({sql})
+        SELECT a.soc_code, {sums}, SUM(j.n_chunks) AS job_id
+        FROM j JOIN adverts a ON a.jobId = j.job_id
+        WHERE a.soc_code IS NOT NULL
+        GROUP BY a.soc_code
+        ORDER BY a.soc_code""", conn, params=params)
+    df["data_intensity"] = df[data_types].sum(axis=1)
+    return df
+
+
+def filtered_chunks_query(conn, types, data_types, min_similarity, term_threshold, **job_filter):
+    """Kept chunks of kept jobs with their SOC and job-level counts (filtered_chunks)."""
+    sql, params = _job_level_sql(types, data_types, min_similarity, term_threshold, **job_filter)
+    chunk_columns = [row[1] for row in conn.execute("PRAGMA table_info(chunks)")]
+    margin = ", c.type_margin" if "type_margin" in chunk_columns else ""
+    job_columns = ", ".join(f"j.{quote(t)}" for t in [*types, "Count_DataTerms"])
+    return pd.read_sql_query(f"""
+        WITH j AS ({sql})
+        SELECT c.job_id, c.noun_chunk, c.similarity_to_data, a.soc_code, c.Type{margin}, {job_columns}
+        FROM chunks c
+        JOIN j ON j.job_id = c.job_id
+        LEFT JOIN adverts a ON a.jobId = c.job_id
+        WHERE c.similarity_to_data >= ?""", conn, params=[*params, min_similarity])
+
+
+def chunk_slice(conn, chunk_type=None, soc_code=None, start=None, end=None, min_similarity=None):
+    """Chunks with their advert's SOC and date, e.g. data_analytics chunks for 2425 in March:
+    chunk_slice(conn, "data_analytics", "2425", "2022-03-01", "2022-04-01")."""
+    conditions, params = [], []
+    for sql, value in [("c.Type = ?", chunk_type), ("a.soc_code = ?", soc_code),
+                       ("a.date >= ?", start), ("a.date < ?", end)]:
+        if value is not None:
+            conditions.append(sql)
+            params.append(str(value))
+    if min_similarity is not None:
+        conditions.append("c.similarity_to_data >= ?")
+        params.append(float(min_similarity))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return pd.read_sql_query(f"""
+        SELECT c.*, a.soc_code, a.date
+        FROM chunks c JOIN adverts a ON a.jobId = c.job_id
+        {where}""", conn, params=params)
+
+
+def job_level_with_soc(conn, columns):
+    """Stored job_level rows with each job's soc_code (for the sector bootstrap)."""
+    selected = ", ".join(f"j.{quote(c)}" for c in columns)
+    return pd.read_sql_query(f"""
+        SELECT {selected}, a.soc_code
+        FROM job_level j
+        LEFT JOIN (SELECT jobId, MIN(soc_code) AS soc_code FROM adverts GROUP BY jobId) a
+            ON a.jobId = j.job_id""", conn)
+
+
+def sector_totals_query(conn, conc, value_columns):
+    """concordance.sector_totals() over the stored soc_level table, as one join.
+
+    The concordance goes in as a temporary table, so the store file is not changed.
+    """
+    conn.execute("DROP TABLE IF EXISTS temp.concordance")
+    conn.execute("CREATE TEMP TABLE concordance (concordance TEXT, soc_code TEXT, sector TEXT, weight REAL)")
+    conn.executemany("INSERT INTO temp.concordance VALUES (?, ?, ?, ?)",
+                     conc[["concordance", "soc_code", "sector", "weight"]].itertuples(index=False))
+    sums = ", ".join(f"COALESCE(SUM(c.weight * s.{quote(v)}), 0.0) AS {quote(v)}" for v in value_columns)
+    totals = pd.read_sql_query(f"""
+        SELECT c.concordance, c.sector, {sums}
+        FROM temp.concordance c LEFT JOIN soc_level s ON s.soc_code = c.soc_code
+        GROUP BY c.concordance, c.sector
+        ORDER BY MIN(c.rowid)""", conn)
+    conn.execute("DROP TABLE temp.concordance")
+
+    overall = pd.read_sql_query(
+        "SELECT " + ", ".join(f"TOTAL({quote(v)}) AS {quote(v)}" for v in value_columns) + " FROM soc_level",
+        conn).iloc[0]
+    unmapped = (1 - totals.groupby("concordance", sort=False)[value_columns].sum() / overall).fillna(0.0)
+    return totals, unmapped
+
+
+# ----------------------------
+# Script: load the pipeline outputs into a fresh store
+# ----------------------------
+def main():
+    from job_classification import tag, vector_cache
+
+    started = time.perf_counter()
+    adverts = read_parquet(ADVERTS_PATH)
+
+    def chunk_batches():
+        dataset = ds.dataset(CHUNKS_PATH, format="parquet")
+        for batch in dataset.to_batches(columns=["job_id", "noun_chunk", "similarity_to_data"],
+                                        batch_size=LOAD_BATCH_ROWS):
+            if not batch.num_rows:
+                continue
+            chunks = batch.to_pandas()
+            chunks["Type"], margin = tag(chunks["noun_chunk"])
+            if margin is not None:
+                chunks["type_margin"] = margin
+            yield chunks
+
+    n_chunks = build_store(STORE_PATH, adverts, chunk_batches(),
+                           read_parquet(JOB_LEVEL_PATH), read_parquet(SOC_LEVEL_PATH))
+    if vector_cache is not None:
+        vector_cache.close()
+    print(f"🗄️ {len(adverts)} adverts and {n_chunks} noun chunks loaded in "
+          f"{time.perf_counter() - started:.1f}s")
+    print(f"✅ Store saved to: {STORE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+from paths import DATA_DIR
+from schemas import ADVERTS, DUPLICATE_MAP, read_parquet, write_parquet
+
+# Runs between synthetic_soc_data.py and bgt_gb_noun_chunks.py: reposted and
+# agency-duplicated adverts are collapsed to one representative each
+INPUT_FILE = os.path.join(DATA_DIR, "enriched_with_soc.parquet")
+OUTPUT_FILE = os.path.join(DATA_DIR, "enriched_with_soc_dedup.parquet")
+# duplicate jobId -> representative jobId (+ cluster size), for re-weighting counts later
+DUPLICATE_MAP_FILE = os.path.join(DATA_DIR, "duplicate_map.parquet")
+
+SHINGLE_SIZE = 5           # words per shingle
+NUM_PERM = 128             # MinHash signature length
+BANDS = 16                 # LSH bands of NUM_PERM // BANDS rows each
+SIMILARITY_THRESHOLD = 0.8  # estimated Jaccard a candidate pair needs to count as a duplicate
+SIGNATURE_BLOCK = 20_000   # adverts shingled at a time, bounds peak memory
+SEED = 42
+
+_MERSENNE_MULT = np.uint64(0x9E3779B97F4A7C15)
+
+
+# Lowercase word tokens per advert, exploded to one row per token (index = advert position)
+def tokenise(descriptions):
+    words = (descriptions.fillna("").astype(str).str.lower()
+             .str.replace(r"[^a-z0-9]+", " ", regex=True).str.split())
+    return words.explode().dropna()
+
+
+# 64-bit hash of every SHINGLE_SIZE-word window, computed for all windows at once.
+# Adverts shorter than a shingle get a single shingle over all their words.
+def shingle_hashes(tokens):
+    doc = tokens.index.to_numpy()
+    codes, vocab = pd.factorize(tokens)
+    values = pd.util.hash_array(np.asarray(vocab, dtype=object))[codes]
+    n = len(values)
+    starts = np.r_[0, np.flatnonzero(doc[1:] != doc[:-1]) + 1]
+    lengths = np.diff(np.r_[starts, n])
+    pos = np.arange(n) - np.repeat(starts, lengths)
+    doc_len = np.repeat(lengths, lengths)
+
+    hashes = np.zeros(n, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for j in range(SHINGLE_SIZE):
+            shifted = np.zeros(n, dtype=np.uint64)
+            inside = pos + j < doc_len
+            shifted[inside] = values[np.flatnonzero(inside) + j]
+            hashes = hashes * _MERSENNE_MULT + shifted
+    keep = pos <= np.maximum(doc_len - SHINGLE_SIZE, 0)
+    return doc[keep], hashes[keep]
+
+
+# MinHash signatures (adverts x NUM_PERM): min of (a * x + b) mod 2^64 over each advert's shingles
+def minhash_signatures(descriptions):
+    rng = np.random.default_rng(SEED)
+    a = rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+
+    # Adverts without any words keep the max value everywhere and never collide below
+    signatures = np.full((len(descriptions), NUM_PERM), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, len(descriptions), SIGNATURE_BLOCK):
+        block = descriptions.iloc[start:start + SIGNATURE_BLOCK].reset_index(drop=True)
+        tokens = tokenise(block)
+        if tokens.empty:
+            continue
+        doc, hashes = shingle_hashes(tokens)
+        doc_starts = np.r_[0, np.flatnonzero(doc[1:] != doc[:-1]) + 1]
+        rows = start + doc[doc_starts]
+        with np.errstate(over="ignore"):
+            for p in range(NUM_PERM):
+                signatures[rows, p] = np.minimum.reduceat(hashes * a[p] + b[p], doc_starts)
+    return signatures
+
+
+# Near-duplicate clusters via LSH banding: adverts sharing any band bucket are
+# candidates, each is checked against its bucket's first advert, and verified
+# pairs are joined into clusters with connected components
+def duplicate_clusters(signatures):
+    n = len(signatures)
+    rows = NUM_PERM // BANDS
+    advert = np.flatnonzero(~(signatures == np.iinfo(np.uint64).max).all(axis=1))
+    band_mult = np.random.default_rng(SEED + 1).integers(1, 2**63, rows, dtype=np.uint64)
+
+    heads, members = [], []
+    for band in range(BANDS):
+        with np.errstate(over="ignore"):
+            keys = (signatures[:, band * rows:(band + 1) * rows] * band_mult).sum(axis=1)
+        head = pd.Series(advert).groupby(keys[advert], sort=False).transform("min").to_numpy()
+        linked = head != advert
+        heads.append(head[linked])
+        members.append(advert[linked])
+
+    heads, members = np.concatenate(heads), np.concatenate(members)
+    pairs = pd.DataFrame({"head": heads, "member": members}).drop_duplicates().to_numpy()
+    # Share of equal MinHash values estimates the Jaccard similarity of the shingle sets
+    similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+    pairs = pairs[similarity >= SIMILARITY_THRESHOLD]
+
+    graph = sparse.coo_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    return labels
+
+
+def main():
+    df = read_parquet(INPUT_FILE)
+    df.reset_index(drop=True, inplace=True)
+
+    signatures = minhash_signatures(df["jobDescription"])
+    labels = duplicate_clusters(signatures)
+
+    # Representative = first advert of each cluster in file order
+    clusters = pd.DataFrame({"cluster": labels, "jobId": df["jobId"].to_numpy()})
+    representative = clusters.groupby("cluster")["jobId"].transform("first")
+    cluster_size = clusters.groupby("cluster")["cluster"].transform("size")
+    is_representative = ~clusters["cluster"].duplicated()
+
+    deduped = df[is_representative.to_numpy()].copy()
+    deduped["duplicate_count"] = cluster_size[is_representative].to_numpy()
+    write_parquet(deduped, OUTPUT_FILE, ADVERTS)
+
+    duplicate_map = pd.DataFrame({
+        "jobId": clusters["jobId"],
+        "representative_jobId": representative,
+        "cluster_size": cluster_size
+    })[~is_representative]
+    write_parquet(duplicate_map, DUPLICATE_MAP_FILE, DUPLICATE_MAP)
+
+    print(f"🧹 {len(df)} adverts -> {len(deduped)} after removing {len(duplicate_map)} near-duplicates "
+          f"(Jaccard >= {SIMILARITY_THRESHOLD})")
+    print(f"✅ Saved to: {OUTPUT_FILE} (duplicate map: {DUPLICATE_MAP_FILE})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import re
+import sqlite3
+
+import numpy as np
+
+_whitespace = re.compile(r"\s+")
+
+
+def normalise_text(text):
+    return _whitespace.sub(" ", str(text)).strip()
+
+
+def text_key(text, model_id):
+    return hashlib.sha1(f"{model_id}\0{normalise_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Append-only on-disk store of sentence embeddings for one model.
+
+    Vectors live in a memory-mapped array (vectors.f32 or vectors.f16) and a
+    SQLite table maps sha1(model id + normalised text) -> row. `matrix` is a
+    no-copy view of every stored row, so later stages can read vectors straight
+    from disk; `encode` only runs the model on texts it has not seen.
+    """
+
+    def __init__(self, directory, model_id, dim, dtype=np.float32, initial_entries=16_384):
+        self.model_id = model_id
+        self.directory = os.path.join(directory, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_id))
+        os.makedirs(self.directory, exist_ok=True)
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.vectors_path = os.path.join(self.directory, f"vectors.f{self.dtype.itemsize * 8}")
+
+        self.conn = sqlite3.connect(os.path.join(self.directory, f"index.f{self.dtype.itemsize * 8}.sqlite"))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, row INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        """)
+        self.size = self._meta("size", 0)
+        self.capacity = self._meta("capacity", initial_entries)
+        self._open_vectors()
+        self.hits = self.misses = 0
+
+    def _meta(self, name, default):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def _open_vectors(self):
+        size = self.capacity * self.dim * self.dtype.itemsize
+        with open(self.vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self.vectors = np.memmap(self.vectors_path, dtype=self.dtype, mode="r+",
+                                 shape=(self.capacity, self.dim))
+
+    @property
+    def matrix(self):
+        return self.vectors[:self.size]
+
+    def rows(self, keys):
+        """Row of every key in `matrix` (-1 where the key is not stored)."""
+        found = {}
+        keys = list(keys)
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), 500):
+            batch = unique[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            found.update(self.conn.execute(
+                f"SELECT key, row FROM embeddings WHERE key IN ({placeholders})", batch
+            ).fetchall())
+        return np.array([found.get(key, -1) for key in keys], dtype=np.int64)
+
+    def add(self, keys, vectors):
+        """Append vectors for new keys and return their rows."""
+        n = len(keys)
+        if self.size + n > self.capacity:
+            self.vectors.flush()
+            del self.vectors
+            while self.capacity < self.size + n:
+                self.capacity *= 2
+            self._open_vectors()
+        rows = np.arange(self.size, self.size + n)
+        self.vectors[rows] = np.asarray(vectors, dtype=self.dtype)
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO embeddings (key, row) VALUES (?, ?)",
+                                  zip(keys, rows.tolist()))
+            self.size += n
+            self._save_meta()
+        return rows
+
+    def encode(self, texts, encode_fn):
+        """Rows in `matrix` for every text, calling encode_fn only on unseen texts."""
+        keys = [text_key(text, self.model_id) for text in texts]
+        rows = self.rows(keys)
+        missing = rows < 0
+        self.hits += int((~missing).sum())
+        self.misses += int(missing.sum())
+        if missing.any():
+            new = dict.fromkeys(k for k, m in zip(keys, missing) if m)
+            texts_by_key = {k: t for k, t in zip(keys, texts)}
+            new_rows = self.add(list(new), encode_fn([texts_by_key[k] for k in new]))
+            lookup = dict(zip(new, new_rows))
+            rows[missing] = [lookup[k] for k, m in zip(keys, missing) if m]
+        return rows
+
+    def _save_meta(self):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+            [("size", self.size), ("capacity", self.capacity)]
+        )
+
+    def close(self):
+        self.vectors.flush()
+        with self.conn:
+            self._save_meta()
+        self.conn.close()
@@ -1,83 +1,300 @@
+import os
+
+import numpy as np
 import pandas as pd
+import pyarrow.dataset as ds
+
+from paths import DATA_DIR, MAPPING_DIR, SCRIPTS_DIR
+from schemas import ParquetBatchWriter, filtered_chunks_schema, job_level_schema, soc_level_schema, write_parquet
+from chunk_tagging import load_rules, compile_rules, chunk_types, tag_chunks, count_by_job
+from chunk_prototypes import load_seed_phrases, prototype_matrix, classify_chunks
 
 # Load data (adjust path as needed)
-df = pd.read_csv("/Users/saurabhkumar/Desktop/UK_JOB_OECD/Scripts/noun_chunks_with_similarity.csv")
+# Chunk table (job_id, noun_chunk, similarity) and job table written by bgt_gb_noun_chunks.py
+CHUNKS_PATH = os.path.join(SCRIPTS_DIR, "noun_chunks_with_similarity")
+JOBS_PATH = os.path.join(SCRIPTS_DIR, "noun_chunks_jobs.parquet")
+
+FILTERED_CHUNKS_PATH = os.path.join(DATA_DIR, "filtered_chunks.parquet")
+JOB_LEVEL_PATH = os.path.join(DATA_DIR, "job_level_aggregated.parquet")
+SOC_LEVEL_PATH = os.path.join(DATA_DIR, "soc_level_aggregated.parquet")
+
+# "memory" loads the whole chunk table; "streaming" reads it in batches of
+# STREAM_BATCH_ROWS and keeps only per-job counts in memory; "sweep" writes
+# SOC data_intensity for every pair of thresholds in the grids below; "store"
+# runs the same filters and counts as SQL inside the corpus store (corpus_store.py),
+# using the chunk Types saved when the store was built
+MODE = "memory"
+STREAM_BATCH_ROWS = 1_000_000
+WRITE_FILTERED_CHUNKS = True  # streaming mode needs a second pass over the chunks for this
 
-# ----------------------------
-# STEP 1: Filter by similarity
-# ----------------------------
 SIMILARITY_THRESHOLD = 0.45
-df = df[df['similarity_to_data'] >= SIMILARITY_THRESHOLD]
-
-# ----------------------------
-# STEP 2: Classify noun chunks
-# ----------------------------
-def chunk_tagger(chunk):
-    chunk = chunk.lower()
-    if any(w in chunk for w in ["typing", "form", "input", "record", "admin"]):
-        return "data_entry"
-    elif any(w in chunk for w in ["sql", "database", "oracle", "server", "data warehouse"]):
-        return "database"
-    elif any(w in chunk for w in ["analytics", "model", "analysis", "visualisation", "python", "machine learning"]):
-        return "data_analytics"
-    return "other"
-
-df["Type"] = df["noun_chunk"].apply(chunk_tagger)
-
-# ----------------------------
-# STEP 3: Add 1 counter per chunk
-# ----------------------------
-df["counter"] = 1  # for aggregations
-
-# ----------------------------
-# STEP 4: Pivot to job level
-# ----------------------------
-job_level = df.pivot_table(index="job_id", 
-                           columns="Type", 
-                           values="counter", 
-                           aggfunc="sum",
-                           fill_value=0).reset_index()
-
-# Fill missing types
-for col in ["data_entry", "database", "data_analytics"]:
-    if col not in job_level.columns:
-        job_level[col] = 0
-
-# Total count of data-related noun chunks
-job_level["Count_DataTerms"] = job_level[["data_entry", "database", "data_analytics"]].sum(axis=1)
-
-# ----------------------------
-# STEP 5: Filter jobs with low counts
-# ----------------------------
 DATA_TERM_THRESHOLD = 2
-job_level = job_level[job_level["Count_DataTerms"] > DATA_TERM_THRESHOLD]
-
-# ----------------------------
-# STEP 6: Filter main df to relevant job_ids
-# ----------------------------
-df = df[df["job_id"].isin(job_level["job_id"])]
-
-# Merge job-level aggregates into main df
-df = df.merge(job_level, on="job_id", suffixes=("", "_job"))
-
-# ----------------------------
-# STEP 7: Aggregate to SOC level
-# ----------------------------
-soc_agg = df.groupby("soc_code").agg({
-    "data_entry": "sum",
-    "database": "sum",
-    "data_analytics": "sum",
-    "job_id": "count"
-}).reset_index()
-
-# Compute data intensity per SOC
-soc_agg["data_intensity"] = soc_agg[["data_entry", "database", "data_analytics"]].sum(axis=1)
-
-# ----------------------------
-# STEP 8: Save Outputs
-# ----------------------------
-df.to_csv("/Users/saurabhkumar/Desktop/UK_JOB_OECD/Data/filtered_chunks.csv", index=False)
-job_level.to_csv("/Users/saurabhkumar/Desktop/UK_JOB_OECD/Data/job_level_aggregated.csv", index=False)
-soc_agg.to_csv("/Users/saurabhkumar/Desktop/UK_JOB_OECD/Data/soc_level_aggregated.csv", index=False)
-
-print("✅ Pipeline complete. Outputs saved.")
+
+# Sensitivity sweep grids (MODE = "sweep")
+SWEEP_SIMILARITY_THRESHOLDS = [0.30, 0.35, 0.40, 0.45, 0.50, 0.55, 0.60, 0.65, 0.70]
+SWEEP_TERM_THRESHOLDS = [0, 1, 2, 3, 4, 5]
+SWEEP_PATH = os.path.join(DATA_DIR, "threshold_sweep.csv")
+
+# Rules live in a config file (Type,pattern); the order of Types is the if/elif priority
+RULES_PATH = os.path.join(MAPPING_DIR, "chunk_type_rules.csv")
+rules = load_rules(RULES_PATH)
+compiled_rules = compile_rules(rules)
+
+# "rules" tags chunks with the substring rules above; "prototypes" assigns each chunk
+# to the nearest Type centroid built from seed phrases (needs the spaCy vectors) and
+# adds a margin column (best minus second-best cosine similarity) to the chunk output
+TAGGER = "rules"
+PROTOTYPES_PATH = os.path.join(MAPPING_DIR, "chunk_type_prototypes.csv")
+PROTOTYPE_CACHE_DIR = os.path.join(SCRIPTS_DIR, "prototype_cache")
+PROTOTYPE_MIN_SIMILARITY = 0.0  # chunks below either cut-off stay "other"
+PROTOTYPE_MIN_MARGIN = 0.0
+VECTORS_ONLY_EXCLUDE = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner", "senter"]
+
+if TAGGER == "prototypes":
+    import spacy
+    from bgt_gb_noun_chunks import MODEL_NAME, CHUNK_CACHE_DIR, CHUNK_CACHE_MAX_ENTRIES
+    from chunk_vector_cache import ChunkVectorCache
+
+    seeds = load_seed_phrases(PROTOTYPES_PATH)
+    nlp = spacy.load(MODEL_NAME, exclude=VECTORS_ONLY_EXCLUDE)
+    prototypes = prototype_matrix(nlp, seeds, PROTOTYPE_CACHE_DIR)
+    # Same cache the extraction script fills, so most chunk vectors are already there
+    vector_cache = ChunkVectorCache(CHUNK_CACHE_DIR, nlp, CHUNK_CACHE_MAX_ENTRIES)
+    TYPES = chunk_types(seeds)
+else:
+    vector_cache = None
+    TYPES = chunk_types(rules)
+DATA_TYPES = [t for t in TYPES if t != "other"]
+MARGIN_COLUMNS = ["type_margin"] if TAGGER == "prototypes" else []
+
+
+# Type for every chunk, plus the prototype margin (None with the substring rules)
+def tag(chunks):
+    if TAGGER == "prototypes":
+        return classify_chunks(chunks, nlp, prototypes, DATA_TYPES, vector_cache,
+                               PROTOTYPE_MIN_SIMILARITY, PROTOTYPE_MIN_MARGIN)
+    return tag_chunks(chunks, compiled_rules), None
+
+
+def classify_in_memory():
+    df = pd.read_parquet(CHUNKS_PATH, columns=["job_id", "noun_chunk", "similarity_to_data"])
+    jobs = pd.read_parquet(JOBS_PATH, columns=["job_id", "soc_code"]).drop_duplicates("job_id")
+
+    # ----------------------------
+    # STEP 1: Filter by similarity
+    # ----------------------------
+    df = df[df['similarity_to_data'] >= SIMILARITY_THRESHOLD]
+
+    # Attach soc_code from the job table only for the chunks we keep
+    df = df.merge(jobs, on="job_id", how="left")
+
+    # ----------------------------
+    # STEP 2: Classify noun chunks
+    # ----------------------------
+    df["Type"], margin = tag(df["noun_chunk"])
+    if margin is not None:
+        df["type_margin"] = margin
+
+    # ----------------------------
+    # STEP 3: Count chunks per job and Type
+    # ----------------------------
+    job_level = count_by_job(df["job_id"], df["Type"], TYPES).reset_index()
+
+    # Total count of data-related noun chunks
+    job_level["Count_DataTerms"] = job_level[DATA_TYPES].sum(axis=1)
+
+    # ----------------------------
+    # STEP 4: Filter jobs with low counts
+    # ----------------------------
+    job_level = job_level[job_level["Count_DataTerms"] > DATA_TERM_THRESHOLD]
+
+    # ----------------------------
+    # STEP 5: Filter main df to relevant job_ids
+    # ----------------------------
+    df = df[df["job_id"].isin(job_level["job_id"])]
+
+    # Merge job-level aggregates into main df
+    df = df.merge(job_level, on="job_id", suffixes=("", "_job"))
+
+    # ----------------------------
+    # STEP 6: Aggregate to SOC level
+    # ----------------------------
+    soc_agg = df.groupby("soc_code", observed=True).agg({
+        **{t: "sum" for t in DATA_TYPES},
+        "job_id": "count"
+    }).reset_index()
+
+    # Compute data intensity per SOC
+    soc_agg["data_intensity"] = soc_agg[DATA_TYPES].sum(axis=1)
+
+    # ----------------------------
+    # STEP 7: Save Outputs
+    # ----------------------------
+    write_parquet(df, FILTERED_CHUNKS_PATH, filtered_chunks_schema(TYPES))
+    write_parquet(job_level, JOB_LEVEL_PATH, job_level_schema(TYPES))
+    write_parquet(soc_agg, SOC_LEVEL_PATH, soc_level_schema(DATA_TYPES))
+
+
+# Kept chunks, batch by batch, with similarity filtering pushed down to the Parquet reader
+def iter_chunk_batches(min_similarity=SIMILARITY_THRESHOLD):
+    dataset = ds.dataset(CHUNKS_PATH, format="parquet")
+    batches = dataset.to_batches(
+        columns=["job_id", "noun_chunk", "similarity_to_data"],
+        filter=ds.field("similarity_to_data") >= min_similarity,
+        batch_size=STREAM_BATCH_ROWS
+    )
+    for batch in batches:
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+# Position of each job_id in the sorted job index (-1 if the job table doesn't have it)
+def job_positions(job_index, job_ids):
+    if len(job_index) == 0:
+        return np.full(len(job_ids), -1)
+    pos = np.searchsorted(job_index, job_ids)
+    pos = np.minimum(pos, len(job_index) - 1)
+    return np.where(job_index[pos] == job_ids, pos, -1)
+
+
+def classify_streaming():
+    jobs = pd.read_parquet(JOBS_PATH, columns=["job_id", "soc_code"]).drop_duplicates("job_id")
+    jobs = jobs.sort_values("job_id").reset_index(drop=True)
+    job_index = jobs["job_id"].to_numpy()
+    n_types = len(TYPES)
+
+    # ----------------------------
+    # PASS 1: count chunks per (job, Type) into a dense int32 array
+    # ----------------------------
+    counts = np.zeros((len(job_index), n_types), dtype=np.int32)
+    for batch in iter_chunk_batches():
+        pos = job_positions(job_index, batch["job_id"].to_numpy())
+        codes = tag(batch["noun_chunk"])[0].cat.codes.to_numpy()
+        known = pos >= 0
+        np.add.at(counts.reshape(-1), pos[known].astype(np.int64) * n_types + codes[known], 1)
+
+    data_cols = [TYPES.index(t) for t in DATA_TYPES]
+    count_data_terms = counts[:, data_cols].sum(axis=1)
+    keep = count_data_terms > DATA_TERM_THRESHOLD
+
+    job_level = pd.DataFrame(counts[keep], columns=TYPES)
+    job_level.insert(0, "job_id", job_index[keep])
+    job_level["Count_DataTerms"] = count_data_terms[keep]
+
+    # ----------------------------
+    # SOC level: each job contributes its counts once per kept chunk, which is
+    # what summing the merged chunk-level frame gives in memory mode
+    # ----------------------------
+    chunks_per_job = counts[keep].sum(axis=1)
+    soc_frame = pd.DataFrame(counts[keep][:, data_cols] * chunks_per_job[:, None], columns=DATA_TYPES)
+    soc_frame["soc_code"] = jobs["soc_code"].to_numpy()[keep]
+    soc_frame["job_id"] = chunks_per_job
+    soc_agg = soc_frame.groupby("soc_code", observed=True)[[*DATA_TYPES, "job_id"]].sum().reset_index()
+    soc_agg["data_intensity"] = soc_agg[DATA_TYPES].sum(axis=1)
+
+    write_parquet(job_level, JOB_LEVEL_PATH, job_level_schema(TYPES))
+    write_parquet(soc_agg, SOC_LEVEL_PATH, soc_level_schema(DATA_TYPES))
+
+    # ----------------------------
+    # PASS 2 (optional): write the kept chunks of kept jobs, batch by batch
+    # ----------------------------
+    if WRITE_FILTERED_CHUNKS:
+        kept_rows = np.full(len(job_index), -1)
+        kept_rows[keep] = np.arange(keep.sum())
+        soc_codes = jobs["soc_code"].to_numpy()
+        writer = ParquetBatchWriter(FILTERED_CHUNKS_PATH, filtered_chunks_schema(TYPES))
+        for batch in iter_chunk_batches():
+            pos = job_positions(job_index, batch["job_id"].to_numpy())
+            rows = np.where(pos >= 0, kept_rows[pos], -1)
+            mask = rows >= 0
+            if not mask.any():
+                continue
+            out = batch[mask].reset_index(drop=True)
+            out["soc_code"] = soc_codes[pos[mask]]
+            out["Type"], margin = tag(out["noun_chunk"])
+            if margin is not None:
+                out["type_margin"] = margin
+            out = pd.concat([out, job_level.iloc[rows[mask]].drop(columns="job_id")
+                             .reset_index(drop=True)], axis=1)
+            writer.write(out)
+        writer.close(empty=pd.DataFrame(columns=["job_id", "noun_chunk", "similarity_to_data", "soc_code", "Type",
+                                                 *MARGIN_COLUMNS, *TYPES, "Count_DataTerms"]))
+
+
+def classify_in_store():
+    from corpus_store import STORE_PATH, connect, job_level_query, soc_level_query, filtered_chunks_query
+
+    conn = connect(STORE_PATH)
+    args = (TYPES, DATA_TYPES, SIMILARITY_THRESHOLD, DATA_TERM_THRESHOLD)
+    write_parquet(job_level_query(conn, *args), JOB_LEVEL_PATH, job_level_schema(TYPES))
+    write_parquet(soc_level_query(conn, *args), SOC_LEVEL_PATH, soc_level_schema(DATA_TYPES))
+    if WRITE_FILTERED_CHUNKS:
+        write_parquet(filtered_chunks_query(conn, *args), FILTERED_CHUNKS_PATH, filtered_chunks_schema(TYPES))
+    conn.close()
+
+
+def threshold_sweep():
+    jobs = pd.read_parquet(JOBS_PATH, columns=["job_id", "soc_code"]).drop_duplicates("job_id")
+    jobs = jobs.sort_values("job_id").reset_index(drop=True)
+    job_index = jobs["job_id"].to_numpy()
+    soc_codes, soc_idx = np.unique(jobs["soc_code"].to_numpy(dtype=str), return_inverse=True)
+    sim_grid = np.sort(np.asarray(SWEEP_SIMILARITY_THRESHOLDS, dtype=np.float64))
+    term_grid = np.asarray(SWEEP_TERM_THRESHOLDS)
+    n_types = len(TYPES)
+
+    # ----------------------------
+    # One pass: bucket every chunk by the highest cut-off it survives, so
+    # counts[i] holds the chunks with sim_grid[i] <= similarity < sim_grid[i + 1]
+    # ----------------------------
+    counts = np.zeros((len(sim_grid), len(job_index), n_types), dtype=np.int32)
+    for batch in iter_chunk_batches(min_similarity=sim_grid[0]):
+        pos = job_positions(job_index, batch["job_id"].to_numpy())
+        codes = tag(batch["noun_chunk"])[0].cat.codes.to_numpy()
+        bins = np.searchsorted(sim_grid, batch["similarity_to_data"].to_numpy(np.float64), side="right") - 1
+        known = pos >= 0
+        np.add.at(counts, (bins[known], pos[known], codes[known]), 1)
+
+    # Reverse cumulative sum: counts[i] becomes everything with similarity >= sim_grid[i]
+    counts = np.flip(np.cumsum(np.flip(counts, axis=0), axis=0), axis=0)
+
+    data_cols = [TYPES.index(t) for t in DATA_TYPES]
+    results = []
+    for i, sim_threshold in enumerate(sim_grid):
+        data_terms = counts[i][:, data_cols].sum(axis=1)
+        chunks_per_job = counts[i].sum(axis=1)
+
+        # Every term threshold at once: jobs x thresholds keep-mask
+        keep = data_terms[:, None] > term_grid[None, :]
+        intensity = np.zeros((len(soc_codes), len(term_grid)))
+        np.add.at(intensity, soc_idx, keep * (data_terms * chunks_per_job)[:, None])
+        n_jobs = np.zeros((len(soc_codes), len(term_grid)), dtype=np.int64)
+        np.add.at(n_jobs, soc_idx, keep)
+
+        grid = pd.DataFrame({
+            "sim_threshold": sim_threshold,
+            "term_threshold": np.tile(term_grid, len(soc_codes)),
+            "soc_code": np.repeat(soc_codes, len(term_grid)),
+            "data_intensity": intensity.ravel(),
+            "n_jobs": n_jobs.ravel()
+        })
+        results.append(grid[grid["n_jobs"] > 0])
+
+    sweep = pd.concat(results, ignore_index=True)
+    sweep["data_intensity"] = sweep["data_intensity"].astype(np.int64)
+    sweep.to_csv(SWEEP_PATH, index=False)
+
+
+if __name__ == "__main__":
+    if MODE == "streaming":
+        classify_streaming()
+    elif MODE == "sweep":
+        threshold_sweep()
+    elif MODE == "store":
+        classify_in_store()
+    else:
+        classify_in_memory()
+
+    if vector_cache is not None:
+        print(f"🧠 Chunk vector cache: {vector_cache.hits} hits, {vector_cache.misses} misses")
+        vector_cache.close()
+    print("✅ Pipeline complete. Outputs saved.")
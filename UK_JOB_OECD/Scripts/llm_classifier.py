@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from paths import LLM_DIR
+
+LLM_REPO = "TheBloke/Mistral-7B-Instruct-v0.2-GGUF"
+LLM_MODEL_FILE = os.path.join(LLM_DIR, "mistral-7b-instruct-v0.2.Q4_K_M.gguf")
+LLM_MODEL_TYPE = "mistral"
+MAX_NEW_TOKENS = 48  # the answer is two short lines
+
+# Each worker process holds its own copy of the model (~4.5 GB for Q4_K_M), so
+# N_WORKERS x THREADS_PER_WORKER should not exceed the physical cores
+THREADS_PER_WORKER = 4
+N_WORKERS = max(1, (os.cpu_count() or 1) // THREADS_PER_WORKER)
+PROMPTS_PER_TASK = 8
+
+# Answers are cached by hash(prompt template, candidate set, description)
+PROMPT_CACHE_PATH = os.path.join(LLM_DIR, "prompt_cache.sqlite")
+
+# Skip the LLM when retrieval is already confident about both the SOC and the data label
+CONFIDENT_SCORE = 0.60   # top cosine similarity
+CONFIDENT_MARGIN = 0.10  # top minus second cosine similarity
+
+DATA_LABELS = ["Data Science", "Data Analytics", "Database Management", "Data Entry", "None"]
+
+PROMPT_TEMPLATE = """
+You are an expert job classifier.
+
+Here is a Job Description:
+\"\"\"
+{description}
+\"\"\"
+
+First, select the most appropriate SOC code among these options:
+{soc_options}
+
+Second, decide whether this job falls into one of these data categories:
+{label_options}
+or None if it does not match.
+
+Output format:
+SOC_CODE: <best matching SOC code>
+DATA_LABEL: <Data Science / Data Analytics / Database Management / Data Entry / None>
+    """
+
+SOC_PATTERN = re.compile(r"SOC_CODE\W*(\d{4})", flags=re.IGNORECASE)
+LABEL_PATTERN = re.compile(
+    r"DATA_LABEL\W*(" + "|".join(re.escape(label) for label in DATA_LABELS) + ")",
+    flags=re.IGNORECASE
+)
+
+
+def build_prompt(description, candidates):
+    return PROMPT_TEMPLATE.format(
+        description=description,
+        soc_options=[code + " - " + title
+                     for code, title in zip(candidates["soc_candidates"], candidates["soc_titles"])],
+        label_options=list(candidates["label_candidates"])
+    )
+
+
+def prompt_key(description, candidates):
+    candidate_set = json.dumps([list(map(str, candidates["soc_candidates"])),
+                                list(map(str, candidates["label_candidates"]))])
+    payload = "\0".join([PROMPT_TEMPLATE, candidate_set, description])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+# SOC_CODE / DATA_LABEL from the model's free text (None where a field is missing)
+def parse_prediction(text):
+    soc = SOC_PATTERN.search(text)
+    label = LABEL_PATTERN.search(text)
+    label_lookup = {l.lower(): l for l in DATA_LABELS}
+    return (soc.group(1) if soc else None,
+            label_lookup[label.group(1).lower()] if label else None)
+
+
+# Retrieval is confident when the best candidate clears CONFIDENT_SCORE and
+# beats the runner-up by CONFIDENT_MARGIN
+def confident(scores):
+    scores = np.vstack(scores)
+    if scores.shape[1] < 2:
+        return scores[:, 0] >= CONFIDENT_SCORE
+    return (scores[:, 0] >= CONFIDENT_SCORE) & (scores[:, 0] - scores[:, 1] >= CONFIDENT_MARGIN)
+
+
+class PromptCache:
+    """SQLite table of raw LLM answers keyed by prompt_key()."""
+
+    def __init__(self, path=PROMPT_CACHE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, answer TEXT NOT NULL)")
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(dict.fromkeys(keys))
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            found.update(self.conn.execute(
+                f"SELECT key, answer FROM answers WHERE key IN ({placeholders})", batch
+            ).fetchall())
+        return found
+
+    def put_many(self, answers):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO answers (key, answer) VALUES (?, ?)", answers)
+
+    def close(self):
+        self.conn.close()
+
+
+# ----------------------------
+# Worker side: one model per process, loaded once by the pool initializer
+# ----------------------------
+_llm = None
+
+
+def _init_worker(threads):
+    global _llm
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    from ctransformers import AutoModelForCausalLM
+    _llm = AutoModelForCausalLM.from_pretrained(
+        LLM_REPO, model_file=LLM_MODEL_FILE, model_type=LLM_MODEL_TYPE,
+        gpu_layers=0, threads=threads, max_new_tokens=MAX_NEW_TOKENS
+    )
+
+
+def _run_prompts(task):
+    return [(key, _llm(prompt)) for key, prompt in task]
+
+
+def run_llm(prompts, n_workers=N_WORKERS, threads=THREADS_PER_WORKER):
+    """Answer {key: prompt} across n_workers processes; returns {key: raw answer}."""
+    items = list(prompts.items())
+    tasks = [items[i:i + PROMPTS_PER_TASK] for i in range(0, len(items), PROMPTS_PER_TASK)]
+    answers = {}
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                             initargs=(threads,)) as pool:
+        for done in pool.map(_run_prompts, tasks):
+            answers.update(done)
+    return answers
+
+
+# ----------------------------
+# Batch runner
+# ----------------------------
+def classify_batch(descriptions, candidates, n_workers=N_WORKERS, cache_path=PROMPT_CACHE_PATH):
+    """SOC code and data label for every advert, given retrieve_candidates() output.
+
+    source says where each answer came from: "retrieval" (confident top
+    candidates, LLM skipped), "cache" (earlier identical prompt) or "llm".
+    """
+    started = time.perf_counter()
+    descriptions = list(descriptions)
+    rows = candidates.reset_index(drop=True)
+    n = len(rows)
+    soc_code, data_label, source, answer = (np.full(n, None, dtype=object) for _ in range(4))
+
+    # Confident retrieval: take the top candidates as they are
+    sure = confident(rows["soc_scores"]) & confident(rows["label_scores"]) if n else np.zeros(0, dtype=bool)
+    for pos in np.flatnonzero(sure):
+        soc_code[pos] = rows.loc[pos, "soc_candidates"][0]
+        data_label[pos] = rows.loc[pos, "label_candidates"][0]
+        source[pos] = "retrieval"
+
+    # Everything else is answered from the cache, or by the worker pool and then cached
+    todo = np.flatnonzero(~sure)
+    keys = {pos: prompt_key(descriptions[pos], rows.loc[pos]) for pos in todo}
+    cache = PromptCache(cache_path)
+    answers = cache.get_many(keys.values())
+    prompts = {keys[pos]: build_prompt(descriptions[pos], rows.loc[pos])
+               for pos in todo if keys[pos] not in answers}
+    if prompts:
+        new_answers = run_llm(prompts, n_workers)
+        cache.put_many(new_answers.items())
+        answers.update(new_answers)
+    cache.close()
+
+    for pos in todo:
+        source[pos] = "llm" if keys[pos] in prompts else "cache"
+        answer[pos] = answers[keys[pos]]
+        soc_code[pos], data_label[pos] = parse_prediction(answer[pos])
+
+    result = pd.DataFrame({"soc_code": soc_code, "data_label": data_label,
+                           "source": source, "answer": answer}, index=candidates.index)
+
+    seconds = time.perf_counter() - started
+    counts = result["source"].value_counts()
+    print(f"⚡ {len(result)} adverts in {seconds:.1f}s ({len(result) / max(seconds, 1e-9):.2f} adverts/sec): "
+          f"{counts.get('retrieval', 0)} from retrieval, {counts.get('cache', 0)} cached, "
+          f"{counts.get('llm', 0)} through the LLM")
+    return result
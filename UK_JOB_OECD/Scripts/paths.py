@@ -0,0 +1,11 @@
+import os
+
+# Every script resolves its files under one project folder. Set UK_JOB_OECD_DIR
+# to run the pipeline somewhere else (pipeline.py passes it on to each stage).
+PROJECT_DIR = os.environ.get("UK_JOB_OECD_DIR", "/Users/saurabhkumar/Desktop/UK_JOB_OECD")
+
+DATA_DIR = os.path.join(PROJECT_DIR, "Data")
+MAPPING_DIR = os.path.join(PROJECT_DIR, "mapping")
+SCRIPTS_DIR = os.path.join(PROJECT_DIR, "Scripts")
+REPORTS_DIR = os.path.join(PROJECT_DIR, "Reports")
+LLM_DIR = os.path.join(PROJECT_DIR, "LLM")
@@ -0,0 +1,289 @@
+"""Run the whole pipeline, skipping stages whose inputs have not changed.
+
+    python pipeline.py                      # everything downstream of the scraped CSV
+    python pipeline.py --only sector report
+    python pipeline.py --force classify     # rerun a stage (and whatever it changes)
+    python pipeline.py --with scrape        # include the network stages (scrape, enrich)
+    python pipeline.py --project-dir /data/UK_JOB_OECD --dry-run
+
+Each stage declares its script, the helper modules and config files it reads,
+its input and output files, and parameters (passed to the script as environment
+variables). A stage's fingerprint is a hash of all of those; when it matches the
+last successful run and the outputs are still there, the stage is skipped. So
+editing Data/SUT_UK.csv only reruns the sector analysis and the report.
+Stages whose inputs are ready run in parallel.
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import paths
+
+STATE_FILE = ".pipeline_state.json"  # fingerprints of the last successful runs, in DATA_DIR
+MAX_PARALLEL = 2
+
+
+class Stage:
+    def __init__(self, name, script, cwd, inputs=(), outputs=(), deps=(), params=None, manual=False):
+        self.name = name
+        self.script = script
+        self.cwd = cwd
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)        # code / config the script reads besides its inputs
+        self.params = params or {}    # environment variables for the script
+        self.manual = manual          # only runs when asked for (e.g. hits the Reed API)
+
+
+# Value of a top-level `NAME = <literal>` switch in a script (default if there is none)
+def script_constant(path, name, default=None):
+    try:
+        with open(path) as f:
+            tree = ast.parse(f.read())
+    except (OSError, SyntaxError):
+        return default
+    value = default
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == name for t in node.targets):
+            try:
+                value = ast.literal_eval(node.value)
+            except ValueError:
+                pass
+    return value
+
+
+def build_stages(project_dir):
+    data = os.path.join(project_dir, "Data")
+    mapping = os.path.join(project_dir, "mapping")
+    scripts = os.path.join(project_dir, "Scripts")
+    scraper = os.path.join(project_dir, "SCRAPPER_REED")
+    reports = os.path.join(project_dir, "Reports")
+
+    def d(name): return os.path.join(data, name)
+    def m(name): return os.path.join(mapping, name)
+    def s(name): return os.path.join(scripts, name)
+    def r(name): return os.path.join(scraper, name)
+
+    reed_helpers = [r("reed_client.py"), r("reed_checkpoint.py"), r("reed_index.py")]
+    schemas = s("schemas.py")  # declared column types of the Parquet hand-offs
+    # What job_classification.py reads to tag chunks; the prototype tagger takes the
+    # model and chunk vector cache settings from the extraction script
+    tagger = [s("chunk_tagging.py"), s("chunk_prototypes.py"), s("chunk_vector_cache.py"),
+              s("bgt_gb_noun_chunks.py"), m("chunk_type_rules.csv"), m("chunk_type_prototypes.csv")]
+    reed_params = {"REED_API_ROOT": os.environ.get("REED_API_ROOT", "https://www.reed.co.uk/api/1.0")}
+
+    # The sector script only writes monthly trends with the concordance mapping and TRENDS on
+    sector_script = s("sector_analysis_with_fake_mapping.py")
+    trends = (script_constant(sector_script, "TRENDS", False)
+              and script_constant(sector_script, "MAPPING") == "concordance")
+    monthly = [d("sector_monthly_intensity.parquet")] if trends else []
+
+    stages = [
+        Stage("scrape", r("REED_SCRAPER.py"), data, outputs=[d("reed_jobs_uk_extended.csv")],
+              deps=reed_helpers, params=reed_params, manual=True),
+        Stage("enrich", r("REED_ENRICH.py"), data, inputs=[d("reed_jobs_uk_extended.csv")],
+              outputs=[d("reed_jobs_uk_enriched.csv")], deps=[*reed_helpers, r("reed_cache.py")],
+              params=reed_params, manual=True),
+        # soc reads the enriched file when enrich has produced one, else the scraped file
+        Stage("soc", s("synthetic_soc_data.py"), scripts,
+              inputs=[d("reed_jobs_uk_extended.csv"), d("reed_jobs_uk_enriched.csv")],
+              outputs=[d("enriched_with_soc.parquet")], deps=[schemas]),
+        Stage("dedup", s("dedup_adverts.py"), scripts, inputs=[d("enriched_with_soc.parquet")],
+              outputs=[d("enriched_with_soc_dedup.parquet"), d("duplicate_map.parquet")], deps=[schemas]),
+        Stage("noun_chunks", s("bgt_gb_noun_chunks.py"), scripts, inputs=[d("enriched_with_soc_dedup.parquet")],
+              outputs=[s("noun_chunks_jobs.parquet"), s("noun_chunks_with_similarity")],
+              deps=[s("chunk_vector_cache.py"), schemas]),
+        Stage("classify", s("job_classification.py"), scripts,
+              inputs=[s("noun_chunks_jobs.parquet"), s("noun_chunks_with_similarity")],
+              outputs=[d("filtered_chunks.parquet"), d("job_level_aggregated.parquet"), d("soc_level_aggregated.parquet")],
+              deps=[*tagger, schemas]),
+        Stage("store", s("corpus_store.py"), scripts,
+              inputs=[d("enriched_with_soc_dedup.parquet"), s("noun_chunks_with_similarity"),
+                      d("job_level_aggregated.parquet"), d("soc_level_aggregated.parquet")],
+              outputs=[d("corpus.sqlite")],
+              deps=[s("job_classification.py"), *tagger, schemas]),
+        Stage("cube", s("aggregate_cube.py"), scripts, inputs=[d("corpus.sqlite"), m("soc_to_sector.csv")],
+              outputs=[d("cube.sqlite")],
+              deps=[s("corpus_store.py"), s("concordance.py"), s("job_classification.py"), *tagger]),
+        Stage("sector", sector_script, scripts,
+              inputs=[d("soc_level_aggregated.parquet"), d("job_level_aggregated.parquet"),
+                      s("noun_chunks_jobs.parquet"), d("corpus.sqlite"), d("cube.sqlite"), d("SUT_UK.csv")],
+              outputs=[d("sector_level_intensity.parquet"), *monthly],
+              deps=[s("concordance.py"), s("corpus_store.py"), s("aggregate_cube.py"), schemas,
+                    m("soc_to_sector.csv")]),
+        Stage("report", s("visualisation.py"), scripts,
+              inputs=[d("sector_level_intensity.parquet"), *monthly],
+              outputs=[os.path.join(reports, "sector_level_report.pdf")], deps=[schemas]),
+    ]
+    # Every script in Scripts/ resolves its files through paths.py
+    for stage in stages:
+        if stage.cwd == scripts:
+            stage.deps.insert(0, s("paths.py"))
+    return stages
+
+
+# ----------------------------
+# Fingerprints
+# ----------------------------
+class Hasher:
+    """Content hashes of files and folders; a file is only re-read when its size or mtime changed."""
+
+    def __init__(self, known):
+        self.known = known  # path -> [size, mtime_ns, sha1]
+
+    def file(self, path):
+        stat = os.stat(path)
+        cached = self.known.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        self.known[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def path(self, path):
+        if os.path.isdir(path):
+            entries = []
+            for root, _, files in sorted(os.walk(path)):
+                for name in sorted(files):
+                    full = os.path.join(root, name)
+                    entries.append(f"{os.path.relpath(full, path)}:{self.file(full)}")
+            return hashlib.sha1("\n".join(entries).encode()).hexdigest()
+        if os.path.exists(path):
+            return self.file(path)
+        return "missing"
+
+
+def fingerprint(stage, hasher):
+    parts = {
+        "script": hasher.path(stage.script),
+        "deps": {p: hasher.path(p) for p in stage.deps},
+        "inputs": {p: hasher.path(p) for p in stage.inputs},
+        "params": stage.params,
+    }
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+# ----------------------------
+# Runner
+# ----------------------------
+def run_stage(stage, project_dir):
+    env = {**os.environ, **stage.params, "UK_JOB_OECD_DIR": project_dir}
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, stage.script], cwd=stage.cwd, env=env)
+    return result.returncode, time.perf_counter() - started
+
+
+def upstream(stages):
+    producers = {out: st.name for st in stages for out in st.outputs}
+    return {st.name: {producers[p] for p in st.inputs if p in producers} - {st.name} for st in stages}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the UK_JOB_OECD pipeline with content-hash caching")
+    parser.add_argument("--project-dir", default=paths.PROJECT_DIR)
+    parser.add_argument("--with", dest="extra", nargs="*", default=[],
+                        help="also consider these manual stages (scrape, enrich)")
+    parser.add_argument("--only", nargs="*", default=[], help="run just these stages if they are stale")
+    parser.add_argument("--force", nargs="*", default=[], help="run these stages even if unchanged")
+    parser.add_argument("--parallel", type=int, default=MAX_PARALLEL)
+    parser.add_argument("--dry-run", action="store_true", help="show what would run")
+    args = parser.parse_args()
+
+    project_dir = os.path.abspath(args.project_dir)
+    stages = build_stages(project_dir)
+    by_name = {st.name: st for st in stages}
+    unknown = set(args.extra) | set(args.only) | set(args.force)
+    unknown -= set(by_name)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}; choose from {', '.join(by_name)}")
+
+    if args.only:
+        selected = set(args.only)
+    else:
+        selected = {st.name for st in stages if not st.manual} | set(args.extra) | set(args.force)
+
+    state_path = os.path.join(project_dir, "Data", STATE_FILE)
+    state = {"stages": {}, "files": {}}
+    if os.path.exists(state_path):
+        with open(state_path) as f:
+            state = json.load(f)
+    hasher = Hasher(state["files"])
+
+    def save_state():
+        os.makedirs(os.path.dirname(state_path), exist_ok=True)
+        with open(state_path, "w") as f:
+            json.dump(state, f, indent=1)
+
+    waiting_on = {name: ups & selected for name, ups in upstream(stages).items() if name in selected}
+    pending = [st for st in stages if st.name in selected]
+    ups = upstream(stages)
+    failed, running, would_run = set(), {}, set()
+
+    def release(name):
+        for st in pending:
+            waiting_on[st.name].discard(name)
+
+    print(f"🧭 Pipeline in {project_dir}: {', '.join(st.name for st in pending)}")
+    with ThreadPoolExecutor(max_workers=max(1, args.parallel)) as pool:
+        while pending or running:
+            # Start every stage whose upstream stages have all finished; skipping a
+            # stage can make the next one ready straight away, so repeat until none are
+            ready = [st for st in pending if not waiting_on[st.name]]
+            while ready:
+                for stage in ready:
+                    pending.remove(stage)
+                    fp = fingerprint(stage, hasher)
+                    outputs_ok = all(os.path.exists(p) for p in stage.outputs)
+                    stale_upstream = args.dry_run and ups[stage.name] & would_run
+                    if (stage.name not in args.force and outputs_ok and not stale_upstream
+                            and state["stages"].get(stage.name) == fp):
+                        print(f"⏭️ {stage.name}: unchanged, skipped")
+                        release(stage.name)
+                    elif args.dry_run:
+                        print(f"▶️ {stage.name}: would run {os.path.basename(stage.script)}")
+                        would_run.add(stage.name)
+                        release(stage.name)
+                    else:
+                        print(f"▶️ {stage.name}: running {os.path.basename(stage.script)}")
+                        running[pool.submit(run_stage, stage, project_dir)] = stage
+                ready = [st for st in pending if not waiting_on[st.name]]
+
+            if not running:
+                # Anything still pending is blocked by a failed stage
+                for st in pending:
+                    print(f"⛔ {st.name}: not run, upstream failed")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                code, seconds = future.result()
+                if code != 0:
+                    print(f"❌ {stage.name}: failed (exit code {code}) after {seconds:.1f}s")
+                    failed.add(stage.name)
+                    continue
+                # Record the fingerprint of what the stage actually ran with
+                state["stages"][stage.name] = fingerprint(stage, hasher)
+                for out in stage.outputs:
+                    hasher.path(out)
+                save_state()
+                print(f"✅ {stage.name}: done in {seconds:.1f}s")
+                release(stage.name)
+
+    if args.dry_run:
+        return 0
+    save_state()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Declared column types for the Parquet files the stages hand to each other.
+# Codes and labels are categorical (stored dictionary-encoded), per-job counts
+# are int32, similarities float32. Columns a schema doesn't list keep the type
+# pandas gives them.
+CATEGORY = "category"
+COUNT = "int32"
+TOTAL = "int64"      # sums over many jobs can outgrow int32
+SIMILARITY = "float32"
+
+ADVERTS = {
+    "jobId": "int64", "employerId": "Int64", "minimumSalary": "float64", "maximumSalary": "float64",
+    "applications": "Int32", "currency": CATEGORY, "locationName": CATEGORY,
+    "matched_keyword": CATEGORY, "soc_code": CATEGORY, "landmark_flag": "bool", "duplicate_count": COUNT,
+}
+DUPLICATE_MAP = {"jobId": "int64", "representative_jobId": "int64", "cluster_size": COUNT}
+JOBS = {"job_id": "int64", "soc_code": CATEGORY, "duplicate_count": COUNT}
+
+
+def chunks_schema(similarity_columns):
+    return {"job_id": "int64", "noun_chunk": CATEGORY, **{c: SIMILARITY for c in similarity_columns}}
+
+
+def job_level_schema(types):
+    return {"job_id": "int64", **{t: COUNT for t in types}, "Count_DataTerms": COUNT}
+
+
+def filtered_chunks_schema(types):
+    return {"job_id": "int64", "noun_chunk": CATEGORY, "similarity_to_data": SIMILARITY,
+            "soc_code": CATEGORY, "Type": CATEGORY, "type_margin": SIMILARITY, **job_level_schema(types)}
+
+
+def soc_level_schema(data_types):
+    return {"soc_code": CATEGORY, **{t: TOTAL for t in data_types}, "job_id": TOTAL, "data_intensity": TOTAL}
+
+
+SECTOR_LEVEL = {"concordance": CATEGORY, "sector": CATEGORY}
+SECTOR_MONTHLY = {"month": CATEGORY, "sector": CATEGORY}
+
+
+# Cast the columns a schema declares; codes become string categories, so a SOC
+# code read back is always "4112", never 4112.0
+def apply_schema(df, schema):
+    df = df.copy()
+    for column, dtype in schema.items():
+        if column not in df.columns:
+            continue
+        if dtype == CATEGORY:
+            values = df[column]
+            if not isinstance(values.dtype, pd.CategoricalDtype) or \
+                    not pd.api.types.is_string_dtype(values.cat.categories):
+                values = values.astype(object).where(values.isna(), values.astype(str))
+            df[column] = values.astype(CATEGORY)
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+def write_parquet(df, path, schema):
+    apply_schema(df, schema).to_parquet(path, index=False)
+
+
+# Arrow table with a fixed physical schema (dictionary<int32, string> for every
+# categorical), so batches written one after another always match
+def to_arrow(df, schema):
+    table = pa.Table.from_pandas(apply_schema(df, schema), preserve_index=False)
+    fields = [pa.field(f.name, pa.dictionary(pa.int32(), pa.string()))
+              if pa.types.is_dictionary(f.type) else f for f in table.schema]
+    return table.cast(pa.schema(fields))
+
+
+class ParquetBatchWriter:
+    """Append DataFrame batches to one Parquet file (one row group per batch)."""
+
+    def __init__(self, path, schema):
+        self.path = path
+        self.schema = schema
+        self.writer = None
+
+    def write(self, df):
+        table = to_arrow(df, self.schema)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self, empty=None):
+        """Finish the file; with no batches written, `empty` (a DataFrame) sets the columns."""
+        if self.writer is None and empty is not None:
+            self.write(empty)
+        if self.writer is not None:
+            self.writer.close()
+
+
+# Memory-mapped read of just the columns a stage needs
+def read_parquet(path, columns=None):
+    return pd.read_parquet(path, columns=columns, memory_map=True)
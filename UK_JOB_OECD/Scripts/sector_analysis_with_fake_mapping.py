@@ -1,59 +1,217 @@
+import os
+import sqlite3
+
+import numpy as np
 import pandas as pd
 import random
 
+from paths import DATA_DIR, MAPPING_DIR, SCRIPTS_DIR
+from schemas import SECTOR_LEVEL, SECTOR_MONTHLY, read_parquet, write_parquet
+from concordance import (DEFAULT_CONCORDANCE, load_concordance, load_sut, normalise_soc,
+                         sector_totals, job_sector_matrix, bootstrap_totals)
+from corpus_store import STORE_PATH, connect, quote, sector_totals_query, job_level_with_soc
+from aggregate_cube import CUBE_PATH, monthly_sector_totals, rolling_totals
+
+DATA_TYPES = ["data_entry", "database", "data_analytics"]
+
+# "concordance" uses the (weighted, many-to-many) SOC -> sector file and the SUT figures;
+# "fake" keeps the old random sector assignment and random GVA/Investment. The shipped
+# mapping/soc_to_sector.csv is only a sample and covers none of the SOC codes that
+# synthetic_soc_data.py assigns, so "fake" stays the default until a real one is in place.
+MAPPING = "fake"
+CONCORDANCE_PATH = os.path.join(MAPPING_DIR, "soc_to_sector.csv")
+SUT_PATH = os.path.join(DATA_DIR, "SUT_UK.csv")
+
+# "parquet" reads the job_classification.py outputs; "store" pushes the SOC -> sector
+# join down into the corpus store (build it with corpus_store.py) and reads from there
+SOURCE = "parquet"
+
+# Bootstrap CIs for alpha and share_of_GVA (either mapping): jobs are resampled
+# from the job-level counts written by job_classification.py
+BOOTSTRAP = False
+N_BOOTSTRAP = 2000
+CI_LEVEL = 0.95
+JOB_LEVEL_PATH = os.path.join(DATA_DIR, "job_level_aggregated.parquet")
+JOBS_PATH = os.path.join(SCRIPTS_DIR, "noun_chunks_jobs.parquet")
+
+# Monthly sector trends (concordance mapping only), read from the cube that
+# aggregate_cube.py keeps up to date; the rolling columns sum ROLLING_MONTHS months
+TRENDS = True
+ROLLING_MONTHS = 3
+monthly_output_path = os.path.join(DATA_DIR, "sector_monthly_intensity.parquet")
+
+# Sector table for the first concordance goes to sector_level_intensity.parquet; with
+# several concordances in the file, all of them are also written to the _all file
+output_path = os.path.join(DATA_DIR, "sector_level_intensity.parquet")
+all_output_path = os.path.join(DATA_DIR, "sector_level_intensity_all.parquet")
+
+# Bootstrap CI columns for data_total, alpha and share_of_GVA: jobs are resampled
+# and spread over sectors with `conc`; `df` has one row per (concordance, sector)
+def add_bootstrap_ci(df, conc):
+    job_columns = ["job_id", *DATA_TYPES, "other", "Count_DataTerms"]
+    if SOURCE == "store":
+        job_level = job_level_with_soc(store, job_columns)
+    else:
+        job_level = read_parquet(JOB_LEVEL_PATH, columns=job_columns)
+        jobs = read_parquet(JOBS_PATH, columns=["job_id", "soc_code"]).drop_duplicates("job_id")
+        job_level = job_level.merge(jobs, on="job_id", how="left")
+
+    # Same weighting as soc_level_aggregated.parquet: a job's data counts are
+    # summed once per kept chunk (data terms + "other")
+    chunks_per_job = job_level["Count_DataTerms"] + job_level["other"]
+    job_data_total = job_level[DATA_TYPES].sum(axis=1) * chunks_per_job
+
+    matrix, columns = job_sector_matrix(job_level["soc_code"], job_data_total, conc)
+    if matrix.nnz == 0:
+        print("⚠️ No job's SOC code is in the mapping; skipping the bootstrap")
+        return df
+    print(f"🔁 Bootstrapping {N_BOOTSTRAP} replicates over {matrix.shape[0]} jobs...")
+    replicates = bootstrap_totals(matrix, N_BOOTSTRAP)
+    tail = (1 - CI_LEVEL) / 2
+    low, high = np.quantile(replicates, [tail, 1 - tail], axis=0)
+    ci = pd.DataFrame({"data_total_ci_low": low, "data_total_ci_high": high},
+                      index=columns).reset_index()
+
+    df = df.merge(ci, on=["concordance", "sector"], how="left")
+    for metric, denominator in [("alpha", "Investment"), ("share_of_GVA", "GVA")]:
+        df[f"{metric}_ci_low"] = df["data_total_ci_low"] / df[denominator]
+        df[f"{metric}_ci_high"] = df["data_total_ci_high"] / df[denominator]
+
+    # CI columns next to the metrics they belong to
+    return df[[
+        "concordance", "sector", *DATA_TYPES,
+        "data_total", "data_total_ci_low", "data_total_ci_high", "GVA", "Investment",
+        "alpha", "alpha_ci_low", "alpha_ci_high",
+        "share_of_GVA", "share_of_GVA_ci_low", "share_of_GVA_ci_high"
+    ]]
+
+
 # ----------------------------
 # STEP 1: Load SOC-level data
 # ----------------------------
-df_soc = pd.read_csv("/Users/saurabhkumar/Desktop/UK_JOB_OECD/Data/soc_level_aggregated.csv")
+if SOURCE == "store":
+    store = connect(STORE_PATH)
+    df_soc = pd.read_sql_query(f"SELECT soc_code, {', '.join(map(quote, DATA_TYPES))} FROM soc_level", store)
+else:
+    # soc_code comes back as a string category, so it needs no repair
+    df_soc = read_parquet(os.path.join(DATA_DIR, "soc_level_aggregated.parquet"),
+                          columns=["soc_code", *DATA_TYPES])
 
-# ----------------------------
-# STEP 2: Prepare soc_code column
-# ----------------------------
-df_soc["soc_code"] = df_soc["soc_code"].astype(str).str.split(".").str[0]
+if MAPPING == "concordance":
+    # ----------------------------
+    # STEP 2: Load the concordance and SUT lookup
+    # ----------------------------
+    conc = load_concordance(CONCORDANCE_PATH)
+    df_sut = load_sut(SUT_PATH)
 
-# ----------------------------
-# STEP 3: Generate dummy sector mapping
-# ----------------------------
-unique_soc_codes = df_soc["soc_code"].unique()
-random.seed(42)
+    # ----------------------------
+    # STEP 3: Sector totals for every concordance in one sparse product
+    # ----------------------------
+    if SOURCE == "store":
+        df_all, unmapped = sector_totals_query(store, conc, DATA_TYPES)
+    else:
+        df_all, unmapped = sector_totals(df_soc, conc, DATA_TYPES)
+    for name, shares in unmapped.iterrows():
+        print(f"ℹ️ {name}: share of counts on SOCs missing from the concordance — "
+              + ", ".join(f"{t} {shares[t]:.1%}" for t in DATA_TYPES))
 
-# Define fake sector labels
-sector_labels = ["Retail", "Health", "Admin", "Tech", "Legal", "Finance", "Transport", "IT", "Engineering"]
+    # A concordance that maps none of the counted SOCs would only give all-zero tables
+    first = conc["concordance"].iloc[0] if len(conc) else DEFAULT_CONCORDANCE
+    nothing_mapped = unmapped.index[(unmapped[DATA_TYPES] >= 1 - 1e-9).all(axis=1)]
+    for name in nothing_mapped.drop(first, errors="ignore"):
+        print(f"⚠️ {name}: none of the counted SOC codes are in the concordance")
+    if first in nothing_mapped or first not in unmapped.index:
+        raise SystemExit(f"❌ None of the counted SOC codes are in {CONCORDANCE_PATH} ({first}); "
+                         'add them to the concordance or set MAPPING = "fake"')
 
-# Randomly assign each soc_code to a sector
-soc_to_sector = {soc: random.choice(sector_labels) for soc in unique_soc_codes}
-df_map = pd.DataFrame(list(soc_to_sector.items()), columns=["soc_code", "sector"])
+    df_all["data_total"] = df_all[DATA_TYPES].sum(axis=1)
+    df_all = df_all.join(df_sut[["GVA", "Investment"]], on="sector")
+    df_all["alpha"] = df_all["data_total"] / df_all["Investment"]
+    df_all["share_of_GVA"] = df_all["data_total"] / df_all["GVA"]
 
-# ----------------------------
-# STEP 4: Generate dummy GVA and Investment for each sector
-# ----------------------------
-df_sut = pd.DataFrame(sector_labels, columns=["sector"])
-df_sut["GVA"] = [random.randint(400_000_000, 1_000_000_000) for _ in sector_labels]
-df_sut["Investment"] = [random.randint(15_000_000, 60_000_000) for _ in sector_labels]
+    # ----------------------------
+    # STEP 4 (optional): Bootstrap CIs
+    # ----------------------------
+    if BOOTSTRAP:
+        df_all = add_bootstrap_ci(df_all, conc)
 
-# ----------------------------
-# STEP 5: Merge and aggregate
-# ----------------------------
-df_merged = df_soc.merge(df_map, on="soc_code", how="left")
+    df_sector = df_all[df_all["concordance"] == first].drop(columns="concordance")
+    if df_all["concordance"].nunique() > 1:
+        write_parquet(df_all, all_output_path, SECTOR_LEVEL)
+        print(f"📄 All concordances saved to: {all_output_path}")
+
+    # ----------------------------
+    # STEP 5 (optional): Monthly trends from the cube
+    # ----------------------------
+    if TRENDS and os.path.exists(CUBE_PATH):
+        cube = sqlite3.connect(CUBE_PATH)
+        monthly = monthly_sector_totals(cube, DATA_TYPES, first)
+        cube.close()
+        monthly["data_total"] = monthly[DATA_TYPES].sum(axis=1)
+        df_monthly = rolling_totals(monthly, [*DATA_TYPES, "data_total"], ROLLING_MONTHS)
+        df_monthly = df_monthly.join(df_sut[["GVA", "Investment"]], on="sector")
+        for suffix in ["", "_rolling"]:
+            df_monthly[f"alpha{suffix}"] = df_monthly[f"data_total{suffix}"] / df_monthly["Investment"]
+            df_monthly[f"share_of_GVA{suffix}"] = df_monthly[f"data_total{suffix}"] / df_monthly["GVA"]
+        write_parquet(df_monthly, monthly_output_path, SECTOR_MONTHLY)
+        print(f"📈 Monthly trends ({df_monthly['month'].nunique()} months) saved to: {monthly_output_path}")
+    elif TRENDS:
+        print(f"ℹ️ No cube at {CUBE_PATH}; run aggregate_cube.py for monthly trends")
+
+else:
+    # ----------------------------
+    # STEP 2: Generate dummy sector mapping
+    # ----------------------------
+    unique_soc_codes = df_soc["soc_code"].unique()
+    random.seed(42)
+
+    # Define fake sector labels
+    sector_labels = ["Retail", "Health", "Admin", "Tech", "Legal", "Finance", "Transport", "IT", "Engineering"]
+
+    # Randomly assign each soc_code to a sector
+    soc_to_sector = {soc: random.choice(sector_labels) for soc in unique_soc_codes}
+    df_map = pd.DataFrame(list(soc_to_sector.items()), columns=["soc_code", "sector"])
+
+    # ----------------------------
+    # STEP 3: Generate dummy GVA and Investment for each sector
+    # ----------------------------
+    df_sut = pd.DataFrame(sector_labels, columns=["sector"])
+    df_sut["GVA"] = [random.randint(400_000_000, 1_000_000_000) for _ in sector_labels]
+    df_sut["Investment"] = [random.randint(15_000_000, 60_000_000) for _ in sector_labels]
+
+    # ----------------------------
+    # STEP 4: Merge and aggregate
+    # ----------------------------
+    df_merged = df_soc.merge(df_map, on="soc_code", how="left")
+
+    df_sector = df_merged.groupby("sector").agg({
+        "data_entry": "sum",
+        "database": "sum",
+        "data_analytics": "sum"
+    }).reset_index()
 
-df_sector = df_merged.groupby("sector").agg({
-    "data_entry": "sum",
-    "database": "sum",
-    "data_analytics": "sum"
-}).reset_index()
+    df_sector["data_total"] = df_sector[["data_entry", "database", "data_analytics"]].sum(axis=1)
 
-df_sector["data_total"] = df_sector[["data_entry", "database", "data_analytics"]].sum(axis=1)
+    df_sector = df_sector.merge(df_sut, on="sector", how="left")
 
-df_sector = df_sector.merge(df_sut, on="sector", how="left")
+    df_sector["alpha"] = df_sector["data_total"] / df_sector["Investment"]
+    df_sector["share_of_GVA"] = df_sector["data_total"] / df_sector["GVA"]
 
-df_sector["alpha"] = df_sector["data_total"] / df_sector["Investment"]
-df_sector["share_of_GVA"] = df_sector["data_total"] / df_sector["GVA"]
+    # ----------------------------
+    # STEP 5 (optional): Bootstrap CIs over the random mapping
+    # ----------------------------
+    if BOOTSTRAP:
+        fake_conc = df_map.assign(concordance=DEFAULT_CONCORDANCE, weight=1.0,
+                                  soc_code=normalise_soc(df_map["soc_code"]))
+        df_sector = add_bootstrap_ci(df_sector.assign(concordance=DEFAULT_CONCORDANCE), fake_conc)
+        df_sector = df_sector.drop(columns="concordance")
 
 # ----------------------------
 # STEP 6: Save result
 # ----------------------------
-output_path = "/Users/saurabhkumar/Desktop/UK_JOB_OECD/Data/sector_level_intensity.csv"
-df_sector.to_csv(output_path, index=False)
+write_parquet(df_sector, output_path, SECTOR_LEVEL)
+if SOURCE == "store":
+    store.close()
 
 print("✅ Sector-level analysis complete. Output saved to:")
 print(output_path)
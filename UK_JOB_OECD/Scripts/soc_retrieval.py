@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+
+import faiss
+import numpy as np
+import pandas as pd
+
+from embedding_store import EmbeddingStore
+from paths import MAPPING_DIR, LLM_DIR
+
+EMBED_MODEL = "all-MiniLM-L6-v2"
+ENCODE_BATCH_SIZE = 256
+
+# Description embeddings persist across sessions, keyed by model + normalised text
+EMBEDDING_STORE_DIR = os.path.join(LLM_DIR, "embedding_store")
+EMBEDDING_DTYPE = np.float32  # np.float16 halves the file; scores move by ~1e-3
+
+# Knowledge base: every SOC 2020 unit group and every data label, one row each
+SOC_PATH = os.path.join(MAPPING_DIR, "soc2020_unit_groups.csv")
+LABELS_PATH = os.path.join(MAPPING_DIR, "data_labels.csv")
+INDEX_DIR = os.path.join(LLM_DIR, "retrieval_index")
+
+
+def file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def open_embedding_store(embedder, directory=EMBEDDING_STORE_DIR):
+    return EmbeddingStore(directory, EMBED_MODEL, embedder.get_sentence_embedding_dimension(),
+                          EMBEDDING_DTYPE)
+
+
+# Encode a whole list of texts in large batches; unit-length rows, so inner product = cosine.
+# With a store, only texts it has not seen go through the model.
+def encode(embedder, texts, batch_size=ENCODE_BATCH_SIZE, store=None):
+    def run(batch):
+        vectors = embedder.encode(list(batch), batch_size=batch_size, convert_to_numpy=True,
+                                  normalize_embeddings=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype=np.float32).reshape(len(batch), -1)
+
+    if store is None:
+        return run(texts)
+    rows = store.encode(list(texts), run)
+    return np.asarray(store.matrix[rows], dtype=np.float32)
+
+
+class RetrievalIndex:
+    """Exact inner-product FAISS index over one knowledge-base file.
+
+    The index and its rows are saved under index_dir/name with a manifest of
+    the embedding model and the source file's hash; later sessions load it from
+    disk and it is only rebuilt when the model or the source file changes.
+    """
+
+    def __init__(self, embedder, source_path, text_columns, name, index_dir=INDEX_DIR):
+        self.directory = os.path.join(index_dir, name)
+        self.entries = pd.read_csv(source_path, dtype=str).fillna("")
+        manifest = {"model": EMBED_MODEL, "source": file_digest(source_path)}
+
+        index_path = os.path.join(self.directory, "index.faiss")
+        manifest_path = os.path.join(self.directory, "manifest.json")
+        if os.path.exists(manifest_path) and os.path.exists(index_path):
+            with open(manifest_path) as f:
+                if json.load(f) == manifest:
+                    self.index = faiss.read_index(index_path)
+                    return
+
+        # Title and description together give the embedder more to go on than either alone
+        texts = self.entries[text_columns].agg(". ".join, axis=1)
+        vectors = encode(embedder, texts)
+        self.index = faiss.IndexFlatIP(vectors.shape[1])
+        self.index.add(vectors)
+
+        os.makedirs(self.directory, exist_ok=True)
+        faiss.write_index(self.index, index_path)
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f)
+
+    def search(self, vectors, k):
+        """Top-k rows for every query vector: (scores, entry positions), both queries x k."""
+        k = min(k, self.index.ntotal)
+        return self.index.search(np.ascontiguousarray(vectors, dtype=np.float32), k)
+
+
+def load_indexes(embedder, index_dir=INDEX_DIR):
+    soc_index = RetrievalIndex(embedder, SOC_PATH, ["title", "description"], "soc_codes", index_dir)
+    label_index = RetrievalIndex(embedder, LABELS_PATH, ["label", "description"], "data_labels", index_dir)
+    return soc_index, label_index
+
+
+# Batched retrieval for descriptions encoded with encode(): one search per index,
+# one row per description with the candidate lists and their scores
+def retrieve_candidates(vectors, soc_index, label_index, k_soc=3, k_label=4):
+    soc_scores, soc_pos = soc_index.search(vectors, k_soc)
+    label_scores, label_pos = label_index.search(vectors, k_label)
+
+    soc = soc_index.entries
+    labels = label_index.entries
+    return pd.DataFrame({
+        "soc_candidates": list(soc["soc_code"].to_numpy()[soc_pos]),
+        "soc_titles": list(soc["title"].to_numpy()[soc_pos]),
+        "soc_scores": list(soc_scores),
+        "label_candidates": list(labels["label"].to_numpy()[label_pos]),
+        "label_scores": list(label_scores)
+    })
@@ -1,8 +1,18 @@
+import os
 import pandas as pd
 import random
+import re
+
+from paths import DATA_DIR
+from schemas import ADVERTS, write_parquet
 
 # --- Load your dataset ---
-df = pd.read_csv("/Users/saurabhkumar/Desktop/UK_JOB_OECD/Data/reed_jobs_uk_extended.csv")
+# Full-text adverts from REED_ENRICH.py when they have been fetched, else the search-result snippets
+ENRICHED_FILE = os.path.join(DATA_DIR, "reed_jobs_uk_enriched.csv")
+SCRAPED_FILE = os.path.join(DATA_DIR, "reed_jobs_uk_extended.csv")
+input_path = ENRICHED_FILE if os.path.exists(ENRICHED_FILE) else SCRAPED_FILE
+df = pd.read_csv(input_path)
+print(f"📥 Reading {input_path}")
 
 # --- Rule-based keyword to SOC lookup ---
 keyword_to_soc = {
@@ -15,21 +25,37 @@ keyword_to_soc = {
 fallback_soc_codes = [f"{random.randint(1000, 9999)}" for _ in range(200)]
 fallback_soc_codes = list(set(fallback_soc_codes))  # remove duplicates
 
+# --- Compile all keywords into one matcher (dict order = priority) ---
+# A lookahead finds a match starting at every position, and at each position the
+# alternation tries keywords in dict order, so the smallest rank seen in a row is
+# the first keyword in keyword_to_soc that the description contains.
+keyword_priority = {keyword.lower(): rank for rank, keyword in enumerate(keyword_to_soc)}
+keyword_pattern = re.compile(
+    "(?=(" + "|".join(re.escape(k) for k in keyword_priority) + "))",
+    flags=re.IGNORECASE
+)
+
 # --- SOC assignment logic based on keyword lookup ---
-def assign_soc_code(description):
-    description = str(description).lower()
-    for keyword, soc_code in keyword_to_soc.items():
-        if keyword in description:
-            return soc_code
-    return random.choice(fallback_soc_codes)
+def assign_soc_codes(descriptions):
+    matches = descriptions.astype("string").str.extractall(keyword_pattern)[0].str.lower()
+    ranks = matches.map(keyword_priority).groupby(level=0).min()
+
+    rank_to_keyword = dict(enumerate(keyword_priority))
+    rank_to_soc = dict(enumerate(keyword_to_soc.values()))
+    result = pd.DataFrame(index=descriptions.index)
+    result["matched_keyword"] = ranks.map(rank_to_keyword).reindex(descriptions.index)
+    result["soc_code"] = ranks.map(rank_to_soc).reindex(descriptions.index).astype(object)
+    result["landmark_flag"] = result["soc_code"].notna()
 
-# --- Apply to each job description ---
-df["soc_code"] = df["jobDescription"].apply(assign_soc_code)
+    unmatched = ~result["landmark_flag"]
+    result.loc[unmatched, "soc_code"] = random.choices(fallback_soc_codes, k=int(unmatched.sum()))
+    return result
 
-# --- Flag if the SOC was assigned using a keyword match (landmark) ---
-df["landmark_flag"] = df["soc_code"].isin(keyword_to_soc.values())
+# --- Apply to the whole description column in one pass ---
+# (also flags whether the SOC was assigned using a keyword match, i.e. a landmark)
+df[["matched_keyword", "soc_code", "landmark_flag"]] = assign_soc_codes(df["jobDescription"])
 
 # --- Save the enriched dataset ---
-output_path = "/Users/saurabhkumar/Desktop/UK_JOB_OECD/Data/enriched_with_soc.csv"
-df.to_csv(output_path, index=False)
+output_path = os.path.join(DATA_DIR, "enriched_with_soc.parquet")
+write_parquet(df, output_path, ADVERTS)
 print(f"✅ Dataset saved to: {output_path}")
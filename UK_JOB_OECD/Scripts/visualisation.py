@@ -3,21 +3,24 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_pdf import PdfPages
 import os
 
+from paths import DATA_DIR, REPORTS_DIR
+from schemas import read_parquet
+
 # ----------------------------
 # Setup: File paths and folders
 # ----------------------------
 # Create the output folder if it doesn't exist
-output_dir = "/Users/saurabhkumar/Desktop/UK_JOB_OECD/Reports"
+output_dir = REPORTS_DIR
 os.makedirs(output_dir, exist_ok=True)
 
 # Input and output files
-data_path = "/Users/saurabhkumar/Desktop/UK_JOB_OECD/Data/sector_level_intensity.csv"
+data_path = os.path.join(DATA_DIR, "sector_level_intensity.parquet")
 pdf_path = os.path.join(output_dir, "sector_level_report.pdf")
 
 # ----------------------------
 # Load sector data
 # ----------------------------
-df = pd.read_csv(data_path)
+df = read_parquet(data_path)
 
 # Create PDF
 pdf = PdfPages(pdf_path)
@@ -109,13 +112,13 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_pdf import PdfPages
 
 # Set paths
-output_dir = "/Users/saurabhkumar/Desktop/UK_JOB_OECD/Reports"
+output_dir = REPORTS_DIR
 os.makedirs(output_dir, exist_ok=True)
-data_path = "/Users/saurabhkumar/Desktop/UK_JOB_OECD/Data/sector_level_intensity.csv"
+data_path = os.path.join(DATA_DIR, "sector_level_intensity.parquet")
 pdf_path = os.path.join(output_dir, "sector_level_report.pdf")
 
 # Load data
-df = pd.read_csv(data_path)
+df = read_parquet(data_path)
 
 # Open PDF
 pdf = PdfPages(pdf_path)
@@ -239,6 +242,35 @@ ax.text(0.05, 0.95, text, va='top', wrap=True)
 pdf.savefig()
 plt.close()
 
+# Chart 5: Monthly trend of data_total by sector (written by the sector script from the cube)
+monthly_path = os.path.join(DATA_DIR, "sector_monthly_intensity.parquet")
+if os.path.exists(monthly_path):
+    df_monthly = read_parquet(monthly_path, columns=["month", "sector", "data_total_rolling"])
+    trend = df_monthly.pivot_table(index="month", columns="sector", values="data_total_rolling",
+                                   aggfunc="sum", observed=True)
+    trend.plot(figsize=(10,6), marker='o')
+    plt.title("Data-Related Tasks by Sector over Time (rolling sum)")
+    plt.xlabel("Month")
+    plt.ylabel("Count of Noun Chunks")
+    plt.xticks(rotation=45, ha='right')
+    plt.tight_layout()
+    pdf.savefig()
+    plt.close()
+
+    # Explanation for Chart 5
+    fig, ax = plt.subplots(figsize=(10,6))
+    ax.axis('off')
+    text = (
+        "Data Tasks over Time\n\n"
+        "Each line is one sector's data_total, summed over a trailing window of months\n"
+        "(ROLLING_MONTHS in the sector script) by the date each advert was posted.\n\n"
+        "Interpretation:\n"
+        "  A rising line means the sector's adverts ask for more data work than in earlier months.\n"
+    )
+    ax.text(0.05, 0.95, text, va='top', wrap=True)
+    pdf.savefig()
+    plt.close()
+
 # Close PDF
 pdf.close()
 